@@ -1,29 +1,36 @@
-from django.shortcuts import get_object_or_404
+from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.utils.functional import SimpleLazyObject
+from django.utils.module_loading import import_string
 from ninja import NinjaAPI
 from ninja.security import HttpBearer
 import jwt
 
-from users.models import User
 from users.auth_token import AuthToken
+from users.cache import get_cached_user, read_auth_bundle
 from users.exceptions import InvalidToken
 from projects.exceptions import ProjectPermissionDenied
 
 
-# TODO: think about lazy loaded user
 class AuthBearer(HttpBearer):
     def authenticate(self, request, token):
         payload = AuthToken.decode_jwt(token)
+        uid = payload["uid"]
 
-        if AuthToken.is_token_blacklisted(token):
+        # Blacklist state and the cached user come in one round trip.
+        blacklisted, cached_user = read_auth_bundle(token=token, uid=uid)
+        if blacklisted:
             raise InvalidToken
 
-        user: User = get_object_or_404(User, id=payload["uid"])
+        # Endpoints that only need payload["uid"] never load the user.
+        user = SimpleLazyObject(lambda: cached_user or get_cached_user(uid=uid))
 
         return {"payload": payload, "access_token": token, "user": user}
 
 
-api = NinjaAPI(version="1", auth=AuthBearer())
+api = NinjaAPI(
+    version="1", auth=AuthBearer(), renderer=import_string(settings.API_RENDERER)()
+)
 
 
 @api.exception_handler(InvalidToken)
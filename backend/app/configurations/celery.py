@@ -8,14 +8,38 @@ class CeleryConfig:
     CELERY_RESULT_BACKEND = getenv("CELERY_BACKEND", "redis://127.0.0.1:6379/0")
     CELERY_TIMEZONE = "Europe/Warsaw"
 
+    # Tasks handled by one send_notification_chunk worker task, and messages
+    # sent per SMTP send_messages call within it.
+    NOTIFICATION_CHUNK_SIZE = 2000
+    NOTIFICATION_BATCH_SIZE = 500
+    # Default for users who did not choose between one email per task and
+    # one digest per sweep, see User.notification_digest.
+    NOTIFICATION_DIGEST = False
+
     CELERY_BEAT_SCHEDULER = "django_celery_beat.schedulers:DatabaseScheduler"
     CELERY_BEAT_SCHEDULE = {
+        # Picks up retries, new emails also trigger a drain on commit.
+        "drain_outbox": {
+            "task": "outbox.tasks.drain_outbox",
+            "schedule": crontab(minute="*"),
+        },
+        # Deletes sent emails older than OUTBOX_RETENTION.
+        "purge_sent_emails": {
+            "task": "outbox.tasks.purge_sent_emails",
+            "schedule": crontab(hour=3, minute=15),
+        },
+        # Reads only the tasks whose next_notification_at has passed.
+        "send_due_task_notifications": {
+            "task": "projects.tasks.send_due_task_notifications",
+            "schedule": crontab(minute="*"),
+        },
+        # Reconciliation for tasks scheduled outside of projects.commands.
         "send_email_for_overdue_tasks": {
             "task": "projects.tasks.send_email_for_overdue_tasks",
-            "schedule": crontab(minute="*/10"),
+            "schedule": crontab(minute=0),
         },
         "send_email_for_pending_tasks": {
             "task": "projects.tasks.send_email_for_pending_tasks",
-            "schedule": crontab(minute="*/10"),
+            "schedule": crontab(minute=30),
         },
     }
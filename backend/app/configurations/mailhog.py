@@ -7,3 +7,24 @@ class MailHogConfig:
     EMAIL_PORT = getenv("EMAIL_PORT", "1025")
     DEFAULT_FROM_EMAIL = "noreply@test.com"
     PASSWORD_RESET_TIMEOUT = 6 * 60 * 60
+    # Seconds before a blocking SMTP operation gives up, so a hung server
+    # cannot stall the outbox drainer.
+    EMAIL_TIMEOUT = 10
+
+    # Emails sent per drain_outbox batch, and how failed ones are retried:
+    # after OUTBOX_RETRY_DELAY seconds, doubling up to OUTBOX_MAX_RETRY_DELAY.
+    OUTBOX_BATCH_SIZE = 100
+    OUTBOX_MAX_ATTEMPTS = 8
+    OUTBOX_RETRY_DELAY = 30
+    OUTBOX_MAX_RETRY_DELAY = 60 * 60
+    # How long a claimed batch is hidden from other drainers. It has to outlast
+    # sending a batch, roughly OUTBOX_MESSAGES_PER_CONNECTION * EMAIL_TIMEOUT
+    # when the server hangs.
+    OUTBOX_LEASE = 10 * 60
+    # How long sent emails are kept before purge_sent_emails deletes them.
+    OUTBOX_RETENTION = 7 * 24 * 60 * 60
+
+    # A batch is split into groups of messages sent over one SMTP connection
+    # each, with at most OUTBOX_MAX_CONNECTIONS connections open in parallel.
+    OUTBOX_MESSAGES_PER_CONNECTION = 25
+    OUTBOX_MAX_CONNECTIONS = 4
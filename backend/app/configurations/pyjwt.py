@@ -6,3 +6,13 @@ class PyJWTConfig:
     JWT_ALGORITHM = "HS256"
     JWT_EXP_TIME = 30 * 60
     JWT_REFRESH_EXP_TIME = 7 * 24 * 60 * 60
+
+    # Verified tokens kept in process by AuthToken.decode_jwt.
+    JWT_CACHE_SIZE = 10_000
+
+    # In-process Bloom filter of blacklisted tokens, so that tokens that were
+    # never revoked skip the Redis lookup, see users.blacklist.
+    JWT_BLACKLIST_FILTER = True
+    JWT_BLACKLIST_FILTER_BITS = 2**23
+    JWT_BLACKLIST_FILTER_HASHES = 7
+    JWT_BLACKLIST_FILTER_REBUILD = 60 * 60
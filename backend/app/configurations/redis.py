@@ -4,9 +4,42 @@ from os import getenv
 class RedisConfig:
     REDIS_URL = f"redis://{getenv('REDIS_USER', 'default')}:{getenv('REDIS_PASSWORD', 'redis_password')}@{getenv('REDIS_HOST', '127.0.0.1')}:{getenv('REDIS_PORT', '6379')}"
 
+    # Connections are pooled per process and shared by the cache, the token
+    # blacklist and its pub/sub listener.
+    REDIS_MAX_CONNECTIONS = int(getenv("REDIS_MAX_CONNECTIONS", "50"))
+    REDIS_SOCKET_TIMEOUT = float(getenv("REDIS_SOCKET_TIMEOUT", "0.5"))
+    REDIS_SOCKET_CONNECT_TIMEOUT = float(getenv("REDIS_SOCKET_CONNECT_TIMEOUT", "0.5"))
+    REDIS_HEALTH_CHECK_INTERVAL = int(getenv("REDIS_HEALTH_CHECK_INTERVAL", "30"))
+
     CACHES = {
         "default": {
-            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "BACKEND": "django_redis.cache.RedisCache",
             "LOCATION": REDIS_URL,
+            "OPTIONS": {
+                "CLIENT_CLASS": "django_redis.client.DefaultClient",
+                "SOCKET_TIMEOUT": REDIS_SOCKET_TIMEOUT,
+                "SOCKET_CONNECT_TIMEOUT": REDIS_SOCKET_CONNECT_TIMEOUT,
+                "CONNECTION_POOL_KWARGS": {
+                    "max_connections": REDIS_MAX_CONNECTIONS,
+                    "health_check_interval": REDIS_HEALTH_CHECK_INTERVAL,
+                    "retry_on_timeout": True,
+                },
+            },
         }
     }
+
+    # Authenticated users are cached in Redis for USER_CACHE_TTL seconds and
+    # in process for USER_CACHE_LOCAL_TTL seconds, see users.cache.
+    USER_CACHE_TTL = 5 * 60
+    USER_CACHE_LOCAL_TTL = 5
+    USER_CACHE_LOCAL_SIZE = 1024
+
+    # Versions behind ETags and fragments, see app.versions. A key that expires
+    # starts over with a new version, so the TTL only bounds the keys left
+    # behind by ids that are no longer asked for.
+    VERSION_TTL = 24 * 60 * 60
+
+    # Rendered TaskOutput fragments, keyed by task version, see
+    # projects.fragments. Changing a task bumps its version, the TTL only bounds
+    # how long unused fragments take up memory.
+    TASK_FRAGMENT_TTL = 60 * 60
@@ -0,0 +1,41 @@
+from functools import lru_cache
+from typing import Optional
+
+from django.core.exceptions import ValidationError
+from ninja import Schema
+
+
+def parse_fields(schema: type[Schema], fields: Optional[str]) -> Optional[set[str]]:
+    """
+    Parses a comma separated fields parameter into names of schema fields.
+    None means every field was asked for.
+    """
+    if fields is None:
+        return None
+
+    names = {name.strip() for name in fields.split(",")} - {""}
+    if not names:
+        raise ValidationError("At least one field is required.")
+    if unknown := names - schema.model_fields.keys():
+        raise ValidationError(f"Unknown fields: {', '.join(sorted(unknown))}.")
+
+    return names
+
+
+@lru_cache(maxsize=256)
+def sparse_schema(schema: type[Schema], fields: frozenset[str]) -> type[Schema]:
+    """
+    Returns a schema with only the given fields of schema, in their original
+    order. Its resolvers are kept, and the fields left out are never read
+    from the object, so they need not be loaded.
+    """
+    namespace = {"__annotations__": {}, "__module__": schema.__module__}
+    for name, field in schema.model_fields.items():
+        if name not in fields:
+            continue
+        namespace["__annotations__"][name] = field.annotation
+        namespace[name] = field
+        if resolver := schema.__dict__.get(f"resolve_{name}"):
+            namespace[f"resolve_{name}"] = resolver
+
+    return type(schema.__name__, (Schema,), namespace)
@@ -31,6 +31,7 @@ class Base(MailHogConfig, PyJWTConfig, RedisConfig, CeleryConfig, Configuration)
         "users",
         "projects",
         "permissions",
+        "outbox",
     ]
 
     MIDDLEWARE = [
@@ -46,6 +47,9 @@ class Base(MailHogConfig, PyJWTConfig, RedisConfig, CeleryConfig, Configuration)
 
     ROOT_URLCONF = "app.urls"
 
+    # Renderer of the NinjaAPI, any ninja.renderers.BaseRenderer will do.
+    API_RENDERER = "app.renderers.ORJSONRenderer"
+
     TEMPLATES = [
         {
             "BACKEND": "django.template.backends.django.DjangoTemplates",
@@ -130,9 +134,18 @@ class Dev(Base):
 
 
 class Tests(Base):
+    CELERY_TASK_ALWAYS_EAGER = True
+
     DATABASES = {
         "default": {
             "ENGINE": "django.db.backends.sqlite3",
             "NAME": "testdatabase",
         }
     }
+
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+    JWT_BLACKLIST_FILTER = False
@@ -5,10 +5,12 @@ from django.conf.urls.static import static
 
 from users.api import router as users_router
 from projects.api import router as projects_router
+from outbox.api import router as outbox_router
 from .api import api
 
 api.add_router("/auth/", users_router)
 api.add_router("/projects/", projects_router)
+api.add_router("/outbox/", outbox_router)
 
 urlpatterns = [
     path("admin/", admin.site.urls),
@@ -0,0 +1,62 @@
+from hashlib import blake2b
+from time import time_ns
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.http import parse_etags
+
+
+def version_key(name: str, id: Optional[int] = None) -> str:
+    return f"version:{name}" if id is None else f"version:{name}:{id}"
+
+
+def bump_versions(*keys: str):
+    """
+    Gives every key a new version once the current transaction commits, so a
+    reader never pairs a new version with data from before the change.
+    """
+    if not keys:
+        return
+
+    # Versions are timestamps rather than counters: a key lost from the cache
+    # can never come back with a version some client already holds, so keys
+    # may expire.
+    transaction.on_commit(
+        lambda: cache.set_many(
+            dict.fromkeys(keys, time_ns()), timeout=settings.VERSION_TTL
+        ),
+        robust=True,
+    )
+
+
+def get_versions(*keys: str, cached: Optional[dict] = None) -> dict[str, int]:
+    """
+    Returns the version of every key, starting a new one for keys missing
+    from the cache. cached holds values the caller already read along with
+    other keys, saving the round trip.
+    """
+    if cached is None:
+        cached = cache.get_many(keys)
+
+    versions = {}
+    for key in keys:
+        if (version := cached.get(key)) is None:
+            # Added rather than set, a version bumped meanwhile is kept.
+            version = time_ns()
+            if not cache.add(key, version, timeout=settings.VERSION_TTL):
+                version = cache.get(key, version)
+        versions[key] = version
+    return versions
+
+
+def get_etag(versions: dict[str, int]) -> str:
+    digest = blake2b(digest_size=12)
+    for key in sorted(versions):
+        digest.update(f"{key}={versions[key]};".encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(request, etag: str) -> bool:
+    return etag in parse_etags(request.headers.get("If-None-Match", ""))
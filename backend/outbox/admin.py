@@ -0,0 +1,20 @@
+from django.contrib import admin
+
+from .models import OutboxEmail
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = (
+        "kind",
+        "object_id",
+        "recipient",
+        "status",
+        "attempts",
+        "next_attempt_at",
+        "created_at",
+        "id",
+    )
+    list_filter = ("status", "kind")
+    search_fields = ("recipient", "subject")
+    ordering = ("-created_at",)
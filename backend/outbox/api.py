@@ -0,0 +1,20 @@
+from django.http import HttpRequest
+from ninja import Router, Schema
+from ninja.errors import HttpError
+
+from .queries import get_outbox_stats
+
+router = Router()
+
+
+class OutboxStats(Schema):
+    depth: int
+    oldest_age: float
+
+
+@router.get("/stats", url_name="outbox_stats", response=OutboxStats)
+def outbox_stats(request: HttpRequest):
+    if not request.auth["user"].is_staff:
+        raise HttpError(403, "Access denied")
+
+    return get_outbox_stats()
@@ -0,0 +1,41 @@
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import OutboxEmail
+from .tasks import drain_outbox
+
+
+def enqueue_emails(emails: Iterable[OutboxEmail]):
+    emails = list(emails)
+    if not emails:
+        return
+
+    # Emails already waiting for the same (recipient, kind, object) are
+    # dropped by the pending unique constraint.
+    OutboxEmail.objects.bulk_create(emails, ignore_conflicts=True)
+
+    transaction.on_commit(drain_outbox.delay, robust=True)
+
+
+def enqueue_email(
+    recipient: str,
+    kind: str,
+    object_id: int,
+    subject: str,
+    message: str,
+    from_email: Optional[str] = None,
+):
+    enqueue_emails(
+        [
+            OutboxEmail(
+                recipient=recipient,
+                kind=kind,
+                object_id=object_id,
+                subject=subject,
+                body=message,
+                from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+            )
+        ]
+    )
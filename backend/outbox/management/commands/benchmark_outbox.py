@@ -0,0 +1,76 @@
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+
+from outbox.models import OutboxEmail
+from outbox.tasks import drain_outbox
+from ..smtp_sink import SMTPSink
+
+
+class Command(BaseCommand):
+    help = (
+        "Drains generated outbox emails into a local SMTP sink with injected "
+        "latency, once per number of parallel connections. All rows are "
+        "rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--emails", type=int, default=500)
+        parser.add_argument(
+            "--latency",
+            type=float,
+            default=0.005,
+            help="Seconds the sink waits before each SMTP reply.",
+        )
+        parser.add_argument("--connections", type=int, nargs="+", default=[1, 4, 8])
+
+    def handle(
+        self, *args, emails: int, latency: float, connections: list[int], **options
+    ):
+        with SMTPSink(latency=latency) as sink:
+            for count in connections:
+                with (
+                    transaction.atomic(),
+                    override_settings(
+                        EMAIL_BACKEND="django.core.mail.backends.smtp.EmailBackend",
+                        EMAIL_HOST="127.0.0.1",
+                        EMAIL_PORT=sink.port,
+                        OUTBOX_MAX_CONNECTIONS=count,
+                        # Claims enough emails per batch to use every connection.
+                        OUTBOX_BATCH_SIZE=count
+                        * settings.OUTBOX_MESSAGES_PER_CONNECTION,
+                    ),
+                ):
+                    self.create_emails(emails)
+                    messages, opened = sink.messages, sink.connections
+
+                    start = perf_counter()
+                    drain_outbox()
+                    elapsed = perf_counter() - start
+
+                    self.stdout.write(
+                        f"{count:>3} connections: {elapsed:8.3f}s, "
+                        f"{sink.messages - messages} messages over "
+                        f"{sink.connections - opened} connections"
+                    )
+                    transaction.set_rollback(True)
+
+    @staticmethod
+    def create_emails(count: int):
+        OutboxEmail.objects.bulk_create(
+            (
+                OutboxEmail(
+                    recipient=f"user-{i}@example.com",
+                    kind="benchmark",
+                    object_id=i,
+                    subject="Benchmark",
+                    body="Benchmark",
+                    from_email="noreply@example.com",
+                )
+                for i in range(count)
+            ),
+            batch_size=5000,
+        )
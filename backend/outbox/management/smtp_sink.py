@@ -0,0 +1,69 @@
+import socketserver
+import threading
+import time
+from typing import Self
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line: str):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        sink: SMTPSink = self.server.sink
+        with sink.lock:
+            sink.connections += 1
+
+        self.reply("220 localhost SMTP sink")
+        while line := self.rfile.readline():
+            command = line.decode(errors="replace").strip().upper()
+            if sink.latency:
+                time.sleep(sink.latency)
+
+            if command.startswith(("EHLO", "HELO")):
+                self.reply("250 localhost")
+            elif command.startswith(("MAIL", "RCPT", "RSET", "NOOP")):
+                self.reply("250 OK")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                with sink.lock:
+                    sink.messages += 1
+                self.reply("250 OK")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class _ThreadingSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class SMTPSink:
+    """
+    Minimal local SMTP server that accepts and discards every message,
+    optionally sleeping before each reply to emulate a remote server.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.messages = 0
+        self.connections = 0
+        self.lock = threading.Lock()
+        self._server = _ThreadingSMTPServer(("127.0.0.1", 0), _SMTPHandler)
+        self._server.sink = self
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def __enter__(self) -> Self:
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
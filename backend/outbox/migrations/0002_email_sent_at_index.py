@@ -0,0 +1,20 @@
+# Generated by Django 5.2 on 2026-10-18 09:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("outbox", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="outboxemail",
+            index=models.Index(
+                condition=models.Q(("status", 2)),
+                fields=["sent_at"],
+                name="outbox_email_sent_at_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,83 @@
+from django.core.mail import EmailMessage
+from django.db import models
+from django.db.models import Q
+from django.db.models.query import QuerySet
+from django.utils.timezone import now
+
+
+class OutboxStatusChoice(models.IntegerChoices):
+    PENDING = 1, "Pending"
+    SENT = 2, "Sent"
+    FAILED = 3, "Failed"
+
+
+PENDING = Q(status=OutboxStatusChoice.PENDING.value)
+SENT = Q(status=OutboxStatusChoice.SENT.value)
+
+
+class OutboxEmailReadModel(QuerySet):
+    def get_pending(self: QuerySet["OutboxEmail"]) -> QuerySet["OutboxEmail"]:
+        return self.filter(PENDING)
+
+    def get_ready(self: QuerySet["OutboxEmail"], at=None) -> QuerySet["OutboxEmail"]:
+        return self.filter(PENDING, next_attempt_at__lte=at or now())
+
+    def get_sent_before(self: QuerySet["OutboxEmail"], at) -> QuerySet["OutboxEmail"]:
+        return self.filter(SENT, sent_at__lt=at)
+
+
+class OutboxEmail(models.Model):
+    objects = models.Manager()
+    read_model = OutboxEmailReadModel.as_manager()
+
+    StatusChoice = OutboxStatusChoice
+
+    recipient = models.EmailField()
+    # What the email is about, e.g. "task_overdue" for the Task with object_id.
+    kind = models.CharField(max_length=50)
+    object_id = models.PositiveBigIntegerField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.EmailField()
+    status = models.IntegerField(
+        choices=StatusChoice.choices,
+        default=StatusChoice.PENDING.value,
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            # Only one copy of an email waits in the queue, sent ones may repeat.
+            models.UniqueConstraint(
+                fields=["recipient", "kind", "object_id"],
+                condition=PENDING,
+                name="outbox_email_pending_uniq",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["next_attempt_at"],
+                condition=PENDING,
+                name="outbox_email_ready_idx",
+            ),
+            models.Index(
+                fields=["sent_at"],
+                condition=SENT,
+                name="outbox_email_sent_at_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.object_id} to {self.recipient}"
+
+    def message(self) -> EmailMessage:
+        return EmailMessage(
+            subject=self.subject,
+            body=self.body,
+            from_email=self.from_email,
+            to=[self.recipient],
+        )
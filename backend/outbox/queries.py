@@ -0,0 +1,16 @@
+from django.db.models import Count, Min
+from django.utils.timezone import now
+
+from .models import OutboxEmail
+
+
+def get_outbox_stats() -> dict:
+    stats = OutboxEmail.read_model.get_pending().aggregate(
+        depth=Count("id"), oldest=Min("created_at")
+    )
+    oldest = stats["oldest"]
+
+    return {
+        "depth": stats["depth"],
+        "oldest_age": (now() - oldest).total_seconds() if oldest else 0.0,
+    }
@@ -0,0 +1,167 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from smtplib import SMTPException
+
+from celery import shared_task
+from celery.utils.log import get_task_logger
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db import transaction
+from django.utils.timezone import now
+
+from .models import OutboxEmail
+from .queries import get_outbox_stats
+
+logger = get_task_logger(__name__)
+
+
+def schedule_retry(email: OutboxEmail, error: Exception, at: datetime):
+    email.attempts += 1
+    email.last_error = repr(error)
+
+    if email.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+        email.status = OutboxEmail.StatusChoice.FAILED
+        return
+
+    delay = settings.OUTBOX_RETRY_DELAY * 2 ** (email.attempts - 1)
+    email.next_attempt_at = at + timedelta(
+        seconds=min(delay, settings.OUTBOX_MAX_RETRY_DELAY)
+    )
+
+
+def mark_failed(email: OutboxEmail, error: Exception):
+    email.attempts += 1
+    email.last_error = repr(error)
+    email.status = OutboxEmail.StatusChoice.FAILED
+
+
+def deliver_over_connection(emails: list[OutboxEmail]):
+    """
+    Sends emails over one SMTP connection and records each outcome on the
+    email. Never raises, so one bad email cannot undo the others.
+    """
+    at = now()
+    connection = get_connection()
+
+    try:
+        connection.open()
+    except (SMTPException, OSError) as error:
+        for email in emails:
+            schedule_retry(email, error, at)
+        return
+
+    # One failing recipient only delays its own email, the rest of the batch
+    # still goes out over the same connection.
+    try:
+        for email in emails:
+            try:
+                connection.send_messages([email.message()])
+            except (SMTPException, OSError) as error:
+                schedule_retry(email, error, at)
+            except ValueError as error:
+                # E.g. BadHeaderError, the email would fail the same way again.
+                mark_failed(email, error)
+            except Exception as error:
+                # Deliberately blind: anything else raised for one email must
+                # not lose the outcome of the rest of the batch.
+                logger.exception(f"Unexpected error sending {email}")
+                schedule_retry(email, error, at)
+            else:
+                email.attempts += 1
+                email.status = OutboxEmail.StatusChoice.SENT
+                email.sent_at = at
+    finally:
+        try:
+            connection.close()
+        except Exception:
+            # The outcomes are already recorded, a failing close must not
+            # undo them.
+            logger.exception("Error closing the SMTP connection")
+
+
+def deliver_emails(emails: list[OutboxEmail]):
+    size = settings.OUTBOX_MESSAGES_PER_CONNECTION
+    batches = [emails[i : i + size] for i in range(0, len(emails), size)]
+    if len(batches) <= 1:
+        return deliver_over_connection(emails)
+
+    # The threads only talk SMTP and update the emails in memory, the caller
+    # saves them. The drainer claims the next batch only after this one is
+    # delivered, which bounds the work in flight.
+    with ThreadPoolExecutor(
+        max_workers=min(settings.OUTBOX_MAX_CONNECTIONS, len(batches))
+    ) as pool:
+        futures = [pool.submit(deliver_over_connection, batch) for batch in batches]
+        for future in as_completed(futures):
+            # Each group has recorded its outcome on its own emails. A group
+            # that still fails keeps whatever it got to, the rest of its
+            # emails stay claimed and are retried when their lease runs out.
+            try:
+                future.result()
+            except Exception:
+                logger.exception("Error delivering an outbox connection group")
+
+
+def claim_ready_emails() -> list[OutboxEmail]:
+    """
+    Claims a batch of ready emails by pushing their next attempt out by
+    OUTBOX_LEASE seconds. The row locks are held only for this short
+    transaction, not while talking SMTP; emails of a drainer that dies
+    become ready again once their lease runs out.
+    """
+    with transaction.atomic():
+        # Concurrent drainers skip each other's batches instead of sending
+        # them twice.
+        emails = list(
+            OutboxEmail.read_model.get_ready()
+            .select_for_update(skip_locked=True)
+            .order_by("next_attempt_at", "id")[: settings.OUTBOX_BATCH_SIZE]
+        )
+        lease_until = now() + timedelta(seconds=settings.OUTBOX_LEASE)
+        for email in emails:
+            email.next_attempt_at = lease_until
+        OutboxEmail.objects.bulk_update(emails, fields=["next_attempt_at"])
+
+    return emails
+
+
+@shared_task
+def purge_sent_emails():
+    # Sent emails are only kept for inspection. Deleting in batches keeps
+    # each statement short.
+    before = now() - timedelta(seconds=settings.OUTBOX_RETENTION)
+    purged = 0
+    while ids := list(
+        OutboxEmail.read_model.get_sent_before(before).values_list("id", flat=True)[
+            : settings.OUTBOX_BATCH_SIZE
+        ]
+    ):
+        purged += OutboxEmail.objects.filter(id__in=ids).delete()[0]
+
+    logger.info(f"Purged {purged} sent emails.")
+
+
+@shared_task
+def drain_outbox():
+    delivered = 0
+    while emails := claim_ready_emails():
+        deliver_emails(emails)
+        OutboxEmail.objects.bulk_update(
+            emails,
+            fields=[
+                "status",
+                "attempts",
+                "next_attempt_at",
+                "last_error",
+                "sent_at",
+            ],
+        )
+        delivered += sum(
+            email.status == OutboxEmail.StatusChoice.SENT for email in emails
+        )
+
+    stats = get_outbox_stats()
+    logger.info(
+        f"Sent {delivered} emails, {stats['depth']} pending, "
+        f"oldest {stats['oldest_age']:.0f}s old."
+    )
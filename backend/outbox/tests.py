@@ -0,0 +1,263 @@
+from datetime import timedelta
+from smtplib import SMTPServerDisconnected
+from unittest.mock import patch
+
+from django.conf import settings
+from django.core import mail
+from django.core.mail import get_connection
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.timezone import now
+
+from users.models import User
+from users.auth_token import AuthToken
+from .models import OutboxEmail
+from .commands import enqueue_email
+from .queries import get_outbox_stats
+from .tasks import (
+    claim_ready_emails,
+    deliver_over_connection,
+    drain_outbox,
+    purge_sent_emails,
+)
+
+
+def enqueue_activation(recipient: str, object_id: int = 1):
+    enqueue_email(
+        recipient=recipient,
+        kind="activation",
+        object_id=object_id,
+        subject="Activate your account",
+        message="Click the link to activate your account.",
+    )
+
+
+class EnqueueEmailTests(TestCase):
+    def test_enqueue_dedupes_pending_emails(self):
+        """
+        The same (recipient, kind, object) is queued once until it is sent.
+        """
+        enqueue_activation("user@test.com")
+        enqueue_activation("user@test.com")
+        enqueue_activation("other@test.com")
+
+        self.assertEqual(OutboxEmail.read_model.get_pending().count(), 2)
+
+        drain_outbox()
+        enqueue_activation("user@test.com")
+
+        self.assertEqual(OutboxEmail.read_model.get_pending().count(), 1)
+
+    def test_enqueue_drains_on_commit(self):
+        """
+        The drainer is triggered once the enqueuing transaction commits.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue_activation("user@test.com")
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["user@test.com"])
+        self.assertEqual(
+            OutboxEmail.objects.get().status, OutboxEmail.StatusChoice.SENT
+        )
+
+
+class DrainOutboxTests(TestCase):
+    def test_failed_email_is_retried_with_backoff(self):
+        """
+        A failing email is pushed back with a doubling delay and the rest of the batch is sent.
+        """
+        enqueue_activation("fail@test.com", object_id=1)
+        enqueue_activation("user@test.com", object_id=2)
+
+        def send_messages(messages):
+            if messages[0].to == ["fail@test.com"]:
+                raise SMTPServerDisconnected
+            mail.outbox.extend(messages)
+            return len(messages)
+
+        with patch(
+            "django.core.mail.backends.locmem.EmailBackend.send_messages",
+            side_effect=send_messages,
+        ):
+            drain_outbox()
+            failed = OutboxEmail.objects.get(recipient="fail@test.com")
+            first_retry_at = failed.next_attempt_at
+
+            OutboxEmail.objects.filter(id=failed.id).update(next_attempt_at=now())
+            drain_outbox()
+            failed.refresh_from_db()
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(failed.status, OutboxEmail.StatusChoice.PENDING)
+        self.assertEqual(failed.attempts, 2)
+        self.assertGreater(failed.next_attempt_at - now(), first_retry_at - now())
+
+    def test_email_fails_after_max_attempts(self):
+        """
+        An email that keeps failing stops being retried after OUTBOX_MAX_ATTEMPTS.
+        """
+        enqueue_activation("fail@test.com")
+
+        with (
+            self.settings(OUTBOX_MAX_ATTEMPTS=1),
+            patch(
+                "django.core.mail.backends.locmem.EmailBackend.open",
+                side_effect=ConnectionRefusedError,
+            ),
+        ):
+            drain_outbox()
+
+        email = OutboxEmail.objects.get()
+        self.assertEqual(email.status, OutboxEmail.StatusChoice.FAILED)
+        self.assertIn("ConnectionRefusedError", email.last_error)
+
+    def test_bad_header_fails_only_its_own_email(self):
+        """
+        An email that can never be sent is marked FAILED, while the emails
+        around it are sent once and not again on the next drain.
+        """
+        enqueue_activation("first@test.com", object_id=1)
+        enqueue_email(
+            recipient="bad@test.com",
+            kind="task_overdue",
+            object_id=2,
+            subject="Your task 'line\nbreak' has exceeded the deadline.",
+            message="",
+        )
+        enqueue_activation("last@test.com", object_id=3)
+
+        drain_outbox()
+        drain_outbox()
+
+        self.assertEqual(
+            [message.to for message in mail.outbox],
+            [["first@test.com"], ["last@test.com"]],
+        )
+        bad = OutboxEmail.objects.get(recipient="bad@test.com")
+        self.assertEqual(bad.status, OutboxEmail.StatusChoice.FAILED)
+        self.assertIn("BadHeaderError", bad.last_error)
+        self.assertEqual(
+            OutboxEmail.objects.filter(status=OutboxEmail.StatusChoice.SENT).count(), 2
+        )
+
+    def test_claimed_emails_are_leased(self):
+        """
+        Claiming pushes the next attempt out, so other drainers skip the batch
+        while it is being sent without a row lock held.
+        """
+        enqueue_activation("user@test.com")
+
+        emails = claim_ready_emails()
+
+        self.assertEqual(len(emails), 1)
+        self.assertFalse(OutboxEmail.read_model.get_ready().exists())
+        self.assertEqual(claim_ready_emails(), [])
+
+    def test_batch_is_split_across_connections(self):
+        """
+        Every connection sends at most OUTBOX_MESSAGES_PER_CONNECTION emails of a batch.
+        """
+        for i in range(5):
+            enqueue_activation("user@test.com", object_id=i)
+
+        with (
+            self.settings(OUTBOX_MESSAGES_PER_CONNECTION=2, OUTBOX_MAX_CONNECTIONS=2),
+            patch("outbox.tasks.get_connection", wraps=get_connection) as connect,
+        ):
+            drain_outbox()
+
+        self.assertEqual(connect.call_count, 3)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertFalse(OutboxEmail.read_model.get_pending().exists())
+
+    def test_failed_group_keeps_other_groups_delivered(self):
+        """
+        A connection group that raises does not discard what the other groups
+        delivered, and its own emails stay claimed for a later retry.
+        """
+        for i in range(4):
+            enqueue_activation(f"user{i}@test.com", object_id=i)
+
+        def deliver(emails):
+            if emails[0].recipient == "user0@test.com":
+                raise RuntimeError
+            deliver_over_connection(emails)
+
+        with (
+            self.settings(OUTBOX_MESSAGES_PER_CONNECTION=2, OUTBOX_MAX_CONNECTIONS=2),
+            patch("outbox.tasks.deliver_over_connection", side_effect=deliver),
+        ):
+            drain_outbox()
+
+        self.assertEqual(
+            set(
+                OutboxEmail.objects.filter(
+                    status=OutboxEmail.StatusChoice.SENT
+                ).values_list("recipient", flat=True)
+            ),
+            {"user2@test.com", "user3@test.com"},
+        )
+        self.assertEqual(OutboxEmail.read_model.get_pending().count(), 2)
+        self.assertFalse(OutboxEmail.read_model.get_ready().exists())
+
+    def test_stats_report_depth_and_age(self):
+        """
+        Queue depth counts pending emails and age is measured from the oldest one.
+        """
+        enqueue_activation("user@test.com", object_id=1)
+        enqueue_activation("user@test.com", object_id=2)
+        OutboxEmail.objects.filter(object_id=1).update(
+            created_at=now() - timedelta(minutes=5)
+        )
+
+        stats = get_outbox_stats()
+
+        self.assertEqual(stats["depth"], 2)
+        self.assertGreaterEqual(stats["oldest_age"], 300)
+
+    def test_purge_deletes_only_old_sent_emails(self):
+        """
+        Sent emails past OUTBOX_RETENTION are deleted, recent and unsent ones are kept.
+        """
+        for object_id in range(1, 4):
+            enqueue_activation("user@test.com", object_id=object_id)
+        drain_outbox()
+        enqueue_activation("user@test.com", object_id=4)
+        OutboxEmail.objects.filter(object_id__in=[1, 2]).update(
+            sent_at=now() - timedelta(seconds=settings.OUTBOX_RETENTION + 60)
+        )
+
+        with self.settings(OUTBOX_BATCH_SIZE=1):
+            purge_sent_emails()
+
+        self.assertEqual(
+            set(OutboxEmail.objects.values_list("object_id", flat=True)), {3, 4}
+        )
+
+
+class OutboxStatsViewTests(TestCase):
+    def setUp(self):
+        self.URL = reverse("api-1:outbox_stats")
+
+    def get(self, user: User):
+        return self.client.get(
+            self.URL,
+            HTTP_AUTHORIZATION=f"Bearer {AuthToken.create_tokens(user.id)['access_token']}",
+        )
+
+    def test_stats_are_staff_only(self):
+        """
+        Staff users get the outbox stats, other users get 403.
+        """
+        staff = User.objects.create(
+            email="staff@test.com", is_active=True, is_staff=True
+        )
+        user = User.objects.create(email="user@test.com", is_active=True)
+        enqueue_activation("user@test.com")
+
+        self.assertEqual(self.get(user).status_code, 403)
+
+        response = self.get(staff)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["depth"], 1)
@@ -0,0 +1,22 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from permissions.visibility import rebuild_visibility
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the visibility table from guardian VIEW permissions."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, batch_size: int, **options):
+        with transaction.atomic():
+            projects, tasks = rebuild_visibility(apps, batch_size=batch_size)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rebuilt visibility for {projects} project and {tasks} task grants."
+            )
+        )
@@ -0,0 +1,21 @@
+from django.db import migrations
+
+from permissions.visibility import rebuild_visibility
+
+
+# List endpoints filter through the visibility table, so it is filled from
+# the existing guardian permissions as soon as it exists.
+def backfill_visibility(apps, schema_editor):
+    rebuild_visibility(apps)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("permissions", "0001_initial"),
+        ("guardian", "0002_generic_permissions_index"),
+        ("contenttypes", "0002_remove_content_type_name"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_visibility, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.db import models
+from django.db.models import Q
+
+
+class Visibility(models.Model):
+    """
+    Denormalized copy of the guardian VIEW permissions, kept as plain integer
+    foreign keys so that list queries can filter with one indexed semi-join.
+
+    A row without a task grants visibility of the project, a row with a task
+    grants visibility of that task only.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+"
+    )
+    project = models.ForeignKey(
+        "projects.Project", on_delete=models.CASCADE, related_name="+"
+    )
+    task = models.ForeignKey(
+        "projects.Task", on_delete=models.CASCADE, related_name="+", null=True
+    )
+
+    class Meta:
+        default_permissions = ()
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "project"],
+                condition=Q(task__isnull=True),
+                name="visibility_user_project_uniq",
+            ),
+            models.UniqueConstraint(
+                fields=["user", "task"],
+                condition=Q(task__isnull=False),
+                name="visibility_user_task_uniq",
+            ),
+        ]
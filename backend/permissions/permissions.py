@@ -1,8 +1,16 @@
 from enum import StrEnum
+from functools import reduce
+from itertools import product
+from operator import or_
 
-from guardian.shortcuts import assign_perm, remove_perm
+from django.contrib.auth.models import Permission
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Q
+from guardian.models import UserObjectPermission
 
+from app.versions import bump_versions, version_key
 from users.models import User
+from .models import Visibility
 
 
 class Permissions(StrEnum):
@@ -12,33 +20,234 @@ class Permissions(StrEnum):
     MANAGE_TASKS = "manage_tasks"
 
 
+class PermissionChecker:
+    """
+    Caches a user's object permissions for the lifetime of the user instance,
+    which in the API is a single request.
+
+    Only direct user object permissions are considered, as the application
+    does not grant permissions through groups.
+    """
+
+    def __init__(self, user: User):
+        self.user = user
+        self._cache: dict[tuple[int, str], set[str]] = {}
+
+    @staticmethod
+    def _key(obj) -> tuple[int, str]:
+        return ContentType.objects.get_for_model(obj).id, str(obj.pk)
+
+    def prefetch(self, *objects):
+        if not self.user.is_active or self.user.is_superuser:
+            return
+
+        keys = {self._key(obj) for obj in objects} - self._cache.keys()
+        if not keys:
+            return
+
+        for key in keys:
+            self._cache[key] = set()
+
+        rows = UserObjectPermission.objects.filter(
+            reduce(
+                or_,
+                (Q(content_type_id=ctype, object_pk=pk) for ctype, pk in keys),
+            ),
+            user=self.user,
+        ).values_list("content_type_id", "object_pk", "permission__codename")
+
+        for ctype, pk, codename in rows:
+            self._cache[ctype, pk].add(codename)
+
+    def has_perm(self, perm: str, obj) -> bool:
+        if not self.user.is_active:
+            return False
+        if self.user.is_superuser:
+            return True
+
+        self.prefetch(obj)
+        return perm in self._cache[self._key(obj)]
+
+    def forget(self, obj):
+        self._cache.pop(self._key(obj), None)
+
+
+def get_permission_checker(user: User) -> PermissionChecker:
+    if not hasattr(user, "_permission_checker"):
+        user._permission_checker = PermissionChecker(user)
+    return user._permission_checker
+
+
+def _forget_permissions(user: User, obj):
+    if hasattr(user, "_permission_checker"):
+        user._permission_checker.forget(obj)
+
+
+def _visibility_lookup(obj) -> dict:
+    if obj._meta.model_name == "task":
+        return {"project_id": obj.project_id, "task_id": obj.id}
+    return {"project_id": obj.id, "task_id": None}
+
+
+def _grants_filter(grants, user_field: str, object_field: str, object_value) -> Q:
+    # Grants are grouped on whichever side has fewer distinct values, so
+    # the filter stays a handful of IN lists rather than one term per pair.
+    by_user, by_object = {}, {}
+    for user, obj in grants:
+        by_user.setdefault(user.id, []).append(object_value(obj))
+        by_object.setdefault(object_value(obj), []).append(user.id)
+
+    if len(by_user) <= len(by_object):
+        conditions = (
+            Q(**{user_field: user_id, f"{object_field}__in": values})
+            for user_id, values in by_user.items()
+        )
+    else:
+        conditions = (
+            Q(**{object_field: value, f"{user_field}__in": user_ids})
+            for value, user_ids in by_object.items()
+        )
+    return reduce(or_, conditions)
+
+
+def grant_visibility(grants):
+    Visibility.objects.bulk_create(
+        [
+            Visibility(user_id=user.id, **_visibility_lookup(obj))
+            for user, obj in grants
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def revoke_visibility(grants):
+    if grants[0][1]._meta.model_name == "task":
+        Visibility.objects.filter(
+            _grants_filter(grants, "user_id", "task_id", lambda task: task.id)
+        ).delete()
+    else:
+        Visibility.objects.filter(
+            _grants_filter(grants, "user_id", "project_id", lambda project: project.id),
+            task_id=None,
+        ).delete()
+
+
+def _get_permissions(perms, obj) -> tuple[ContentType, list[int]]:
+    ctype = ContentType.objects.get_for_model(obj)
+    permission_ids = list(
+        Permission.objects.filter(content_type=ctype, codename__in=perms).values_list(
+            "id", flat=True
+        )
+    )
+    return ctype, permission_ids
+
+
+def bulk_assign_grants(perms, grants):
+    """
+    Assigns perms for every (user, object) pair in grants. All objects must
+    be instances of the same model.
+    """
+    grants = list(grants)
+    if not grants:
+        return
+
+    ctype, permission_ids = _get_permissions(perms, grants[0][1])
+    UserObjectPermission.objects.bulk_create(
+        [
+            UserObjectPermission(
+                user_id=user.id,
+                permission_id=permission_id,
+                content_type=ctype,
+                object_pk=str(obj.pk),
+            )
+            for user, obj in grants
+            for permission_id in permission_ids
+        ],
+        ignore_conflicts=True,
+    )
+
+    if Permissions.VIEW in perms:
+        grant_visibility(grants)
+
+    bump_versions(*{version_key("grants", user.id) for user, _ in grants})
+
+    for user, obj in grants:
+        _forget_permissions(user, obj)
+
+
+def bulk_remove_grants(perms, grants):
+    """
+    Removes perms for every (user, object) pair in grants. All objects must
+    be instances of the same model.
+    """
+    grants = list(grants)
+    if not grants:
+        return
+
+    ctype, permission_ids = _get_permissions(perms, grants[0][1])
+    UserObjectPermission.objects.filter(
+        _grants_filter(grants, "user_id", "object_pk", lambda obj: str(obj.pk)),
+        permission_id__in=permission_ids,
+        content_type=ctype,
+    ).delete()
+
+    if Permissions.VIEW in perms:
+        revoke_visibility(grants)
+
+    bump_versions(*{version_key("grants", user.id) for user, _ in grants})
+
+    for user, obj in grants:
+        _forget_permissions(user, obj)
+
+
+def bulk_assign_perms(perms, users, objects):
+    bulk_assign_grants(perms, product(users, objects))
+
+
+def bulk_remove_perms(perms, users, objects):
+    bulk_remove_grants(perms, product(users, objects))
+
+
+STANDARD_PERMISSIONS = (Permissions.VIEW, Permissions.DELETE, Permissions.UPDATE)
+PROJECT_MEMBER_PERMISSIONS = (Permissions.VIEW, Permissions.MANAGE_TASKS)
+TASK_ASSIGNEE_PERMISSIONS = (Permissions.VIEW, Permissions.UPDATE)
+
+
 def assign_standard_permissions(user: User, obj):
-    assign_perm(Permissions.VIEW, user, obj)
-    assign_perm(Permissions.DELETE, user, obj)
-    assign_perm(Permissions.UPDATE, user, obj)
+    bulk_assign_perms(STANDARD_PERMISSIONS, [user], [obj])
 
 
 def remove_standard_permissions(user: User, obj):
-    remove_perm(Permissions.VIEW, user, obj)
-    remove_perm(Permissions.DELETE, user, obj)
-    remove_perm(Permissions.UPDATE, user, obj)
+    bulk_remove_perms(STANDARD_PERMISSIONS, [user], [obj])
 
 
 def assign_project_member_permissions(user: User, project: "Project"):  # noqa: F821
-    assign_perm(Permissions.VIEW, user, project)
-    assign_perm(Permissions.MANAGE_TASKS, user, project)
+    bulk_assign_project_member_permissions([user], project)
 
 
 def remove_project_member_permissions(user: User, project: "Project"):  # noqa: F821
-    remove_perm(Permissions.VIEW, user, project)
-    remove_perm(Permissions.MANAGE_TASKS, user, project)
+    bulk_remove_project_member_permissions([user], project)
+
+
+def bulk_assign_project_member_permissions(users, project: "Project"):  # noqa: F821
+    bulk_assign_perms(PROJECT_MEMBER_PERMISSIONS, users, [project])
+
+
+def bulk_remove_project_member_permissions(users, project: "Project"):  # noqa: F821
+    bulk_remove_perms(PROJECT_MEMBER_PERMISSIONS, users, [project])
 
 
 def assign_task_assignee_permissions(assignee: User, task: "Task"):  # noqa: F821
-    assign_perm(Permissions.VIEW, assignee, task)
-    assign_perm(Permissions.UPDATE, assignee, task)
+    bulk_assign_perms(TASK_ASSIGNEE_PERMISSIONS, [assignee], [task])
 
 
 def remove_task_assignee_permissions(assignee: User, task: "Task"):  # noqa: F821
-    remove_perm(Permissions.VIEW, assignee, task)
-    remove_perm(Permissions.UPDATE, assignee, task)
+    bulk_remove_perms(TASK_ASSIGNEE_PERMISSIONS, [assignee], [task])
+
+
+def bulk_assign_task_assignee_permissions(grants):
+    bulk_assign_grants(TASK_ASSIGNEE_PERMISSIONS, grants)
+
+
+def bulk_remove_task_assignee_permissions(grants):
+    bulk_remove_grants(TASK_ASSIGNEE_PERMISSIONS, grants)
@@ -1,3 +1,142 @@
+from datetime import timedelta
+from importlib import import_module
+from io import StringIO
+
+from django.apps import apps
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+
+from users.models import User
+from projects.models import Project, Task
+from projects import commands, queries
+from .models import Visibility
+from .permissions import (
+    assign_standard_permissions,
+    assign_project_member_permissions,
+    remove_project_member_permissions,
+    assign_task_assignee_permissions,
+    bulk_assign_project_member_permissions,
+    get_permission_checker,
+)
+
+
+def create_user(email: str):
+    return User.objects.create(email=email, password="pass", is_active=True)
+
+
+class VisibilityTests(TestCase):
+    def setUp(self):
+        self.owner = create_user(email="owner@test.com")
+        self.member = create_user(email="member@test.com")
+        self.project = Project.objects.create(owner=self.owner, name="Project")
+        self.task = Task.objects.create(
+            created_by=self.owner,
+            project=self.project,
+            title="Task",
+            due_date=now() + timedelta(days=1),
+        )
+
+    def test_permission_helpers_maintain_visibility(self):
+        """
+        Assigning and removing VIEW permissions keeps the visibility table in sync.
+        """
+        assign_standard_permissions(user=self.owner, obj=self.project)
+        assign_project_member_permissions(user=self.member, project=self.project)
+        assign_task_assignee_permissions(self.member, self.task)
+
+        self.assertQuerySetEqual(
+            queries.get_user_projects(user=self.member), [self.project]
+        )
+        self.assertQuerySetEqual(queries.get_tasks(user=self.member), [self.task])
+        self.assertQuerySetEqual(queries.get_tasks(user=self.owner), [])
+
+        remove_project_member_permissions(user=self.member, project=self.project)
+
+        self.assertQuerySetEqual(queries.get_user_projects(user=self.member), [])
+
+    def test_rebuild_visibility_backfills_from_guardian(self):
+        """
+        rebuild_visibility recreates rows from guardian permissions and skips deleted objects.
+        """
+        assign_standard_permissions(user=self.owner, obj=self.project)
+        assign_task_assignee_permissions(self.member, self.task)
+        deleted_task = Task.objects.create(
+            created_by=self.owner,
+            project=self.project,
+            title="Deleted",
+            due_date=now() + timedelta(days=1),
+        )
+        assign_standard_permissions(user=self.owner, obj=deleted_task)
+        deleted_task.delete()
+        Visibility.objects.all().delete()
+
+        call_command("rebuild_visibility", stdout=StringIO())
+
+        self.assertQuerySetEqual(
+            queries.get_user_projects(user=self.owner), [self.project]
+        )
+        self.assertQuerySetEqual(queries.get_tasks(user=self.member), [self.task])
+        self.assertEqual(Visibility.objects.count(), 2)
+
+    def test_migration_backfills_existing_grants(self):
+        """
+        Existing deployments see their projects right after migrate.
+        """
+        assign_standard_permissions(user=self.owner, obj=self.project)
+        Visibility.objects.all().delete()
+
+        import_module(
+            "permissions.migrations.0002_backfill_visibility"
+        ).backfill_visibility(apps, None)
+
+        self.assertQuerySetEqual(
+            queries.get_user_projects(user=self.owner), [self.project]
+        )
+
+
+class BulkPermissionTests(TestCase):
+    def setUp(self):
+        self.owner = create_user(email="owner@test.com")
+        self.project = Project.objects.create(owner=self.owner, name="Project")
+
+    def count_queries(self, users) -> int:
+        with CaptureQueriesContext(connection) as context:
+            bulk_assign_project_member_permissions(users=users, project=self.project)
+        return len(context.captured_queries)
+
+    def test_bulk_assign_query_count_does_not_depend_on_user_count(self):
+        """
+        Assigning permissions to many users runs the same queries as for one user.
+        """
+        users = [create_user(email=f"member{i}@test.com") for i in range(20)]
+        # Warms up the content type cache.
+        self.count_queries(users[:1])
+
+        self.assertEqual(self.count_queries(users[1:2]), self.count_queries(users[2:]))
+
+        for user in users:
+            self.assertTrue(
+                get_permission_checker(user).has_perm("manage_tasks", self.project)
+            )
+
+    def test_update_project_removes_previous_members(self):
+        """
+        Members dropped from a project lose its permissions and visibility.
+        """
+        kept = create_user(email="kept@test.com")
+        dropped = create_user(email="dropped@test.com")
+        project = commands.create_project(
+            user=self.owner, name="Project", member_ids={kept.id, dropped.id}
+        )
+
+        commands.update_project(
+            user=self.owner, project_id=project.id, name="Renamed", member_ids={kept.id}
+        )
 
-# Create your tests here.
+        self.assertTrue(get_permission_checker(kept).has_perm("view", project))
+        self.assertFalse(get_permission_checker(dropped).has_perm("view", project))
+        self.assertQuerySetEqual(queries.get_user_projects(user=dropped), [])
+        self.assertTrue(get_permission_checker(self.owner).has_perm("change", project))
@@ -0,0 +1,76 @@
+from django.apps.registry import Apps
+
+from .permissions import Permissions
+
+
+def rebuild_visibility(apps: Apps, batch_size: int = 5000) -> tuple[int, int]:
+    """
+    Recreates the visibility table from guardian VIEW permissions and returns
+    the number of project and task grants. Models are taken from apps, so the
+    data migration can run it on historical models.
+    """
+    Project = apps.get_model("projects", "Project")
+    Task = apps.get_model("projects", "Task")
+    Visibility = apps.get_model("permissions", "Visibility")
+    UserObjectPermission = apps.get_model("guardian", "UserObjectPermission")
+
+    # Content types are matched by name, a fresh database has none yet.
+    view_permissions = UserObjectPermission.objects.filter(
+        permission__codename=Permissions.VIEW, content_type__app_label="projects"
+    )
+
+    Visibility.objects.all().delete()
+
+    projects = backfill(
+        Visibility,
+        view_permissions.filter(content_type__model="project"),
+        lambda ids: {
+            id: {"project_id": id, "task_id": None}
+            for id in Project.objects.filter(id__in=ids).values_list("id", flat=True)
+        },
+        batch_size,
+    )
+    tasks = backfill(
+        Visibility,
+        view_permissions.filter(content_type__model="task"),
+        lambda ids: {
+            id: {"project_id": project_id, "task_id": id}
+            for id, project_id in Task.objects.filter(id__in=ids).values_list(
+                "id", "project_id"
+            )
+        },
+        batch_size,
+    )
+
+    return projects, tasks
+
+
+def backfill(Visibility, permissions, resolve, batch_size: int) -> int:
+    created = 0
+    rows = permissions.values_list("user_id", "object_pk").iterator(
+        chunk_size=batch_size
+    )
+
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            created += create_batch(Visibility, batch, resolve)
+            batch = []
+    if batch:
+        created += create_batch(Visibility, batch, resolve)
+
+    return created
+
+
+def create_batch(Visibility, batch, resolve) -> int:
+    # Guardian does not cascade on object deletion, so grants pointing at
+    # objects that no longer exist are skipped here.
+    objects = resolve({int(object_pk) for _, object_pk in batch})
+    visibility = [
+        Visibility(user_id=user_id, **objects[int(object_pk)])
+        for user_id, object_pk in batch
+        if int(object_pk) in objects
+    ]
+    Visibility.objects.bulk_create(visibility, ignore_conflicts=True)
+    return len(visibility)
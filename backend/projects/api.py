@@ -1,28 +1,77 @@
-from django.http import HttpRequest, HttpResponse
+from django.http import HttpRequest, HttpResponse, StreamingHttpResponse
 from django.urls import reverse
+from django.utils.encoding import force_bytes
 from django.db import transaction
 from django.core.exceptions import ValidationError
+from django.db.models import Q, prefetch_related_objects
 from ninja import Router, Schema, Query, FilterSchema, Field, File
 from ninja.files import UploadedFile
-from typing import List, Optional
+from typing import List, Literal, Optional
 from datetime import datetime
 from pydantic import FutureDatetime
 
+from app.fieldsets import parse_fields, sparse_schema
+from app.versions import etag_matches, get_etag, get_versions, version_key
 from . import queries
 from . import commands
-from .models import Task
+from .fragments import get_task_fragments
+from .models import Project, Task
+from .pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    get_ordering,
+    order_keyset,
+    paginate_keyset,
+)
 
 router = Router()
 
 
 ACCEPTED_TYPES = ["image/png", "image/jpeg", "application/pdf"]
 
+MAX_BULK_TASKS = 1000
+
+# Rows fetched per round trip of a streamed task list.
+STREAM_CHUNK_SIZE = 500
+
 
 def validate_task_attachment_type(file: File[UploadedFile]):
     if file.content_type not in ACCEPTED_TYPES:
         raise ValidationError(f"Unsupported file type: {file.content_type}")
 
 
+def with_ordering(
+    fields: Optional[set[str]], ordering: tuple[str, ...]
+) -> Optional[set[str]]:
+    # Sort keys are loaded too, the next cursor is read from the last row.
+    if fields is None:
+        return None
+    return fields | {name.lstrip("-") for name in ordering} - {"rank"}
+
+
+def read_versions(request: HttpRequest, *keys: str) -> dict[str, int]:
+    # Read before the query, so a change made meanwhile yields a new ETag.
+    return get_versions(*keys, version_key("grants", request.auth["payload"]["uid"]))
+
+
+def not_modified(
+    request: HttpRequest, response: HttpResponse, versions: dict[str, int]
+) -> Optional[HttpResponse]:
+    """
+    Sets an ETag built from versions, which include the user's grants, or
+    returns a 304 when the client already holds it.
+    """
+    etag = get_etag(versions)
+
+    if etag_matches(request, etag):
+        response = HttpResponse(status=304)
+        response["ETag"] = etag
+        return response
+
+    response["ETag"] = etag
+    return None
+
+
 class ProjectInput(Schema):
     name: str = Field(max_length=255)
     member_ids: set[int]
@@ -36,6 +85,17 @@ class TaskInput(Schema):
     due_date: Optional[FutureDatetime]
 
 
+class BulkTaskInput(Schema):
+    tasks: list[TaskInput] = Field(min_length=1, max_length=MAX_BULK_TASKS)
+
+
+class BulkTaskUpdateInput(Schema):
+    task_ids: set[int] = Field(min_length=1, max_length=MAX_BULK_TASKS)
+    status: Optional[Task.StatusChoice] = None
+    assignee_id: Optional[int] = None
+    due_date: Optional[FutureDatetime] = None
+
+
 class UserOutput(Schema):
     id: int
     email: str
@@ -69,10 +129,79 @@ class TaskOutput(Schema):
         ]
 
 
+def dump(
+    request: HttpRequest, schema: type[Schema], obj, fields: Optional[set[str]] = None
+) -> dict:
+    if fields is not None:
+        schema = sparse_schema(schema, frozenset(fields))
+    return schema.model_validate(obj, context={"request": request}).model_dump()
+
+
+def render_task(
+    request: HttpRequest, task: Task, fields: Optional[set[str]] = None
+) -> bytes:
+    data = dump(request, TaskOutput, task, fields)
+    return force_bytes(router.api.renderer.render(request, data, response_status=200))
+
+
+def render_task_fragments(
+    request: HttpRequest, tasks: list[Task], versions: dict[str, int]
+) -> list[bytes]:
+    return get_task_fragments(
+        request, tasks, render=lambda task: render_task(request, task), guard=versions
+    )
+
+
+def stream_tasks(
+    request: HttpRequest,
+    response: HttpResponse,
+    tasks,
+    fields: Optional[set[str]] = None,
+) -> StreamingHttpResponse:
+    """
+    Streams tasks as NDJSON, one TaskOutput per line. Rows are read through a
+    server side cursor with attachments prefetched per chunk, so memory stays
+    flat however many tasks match.
+    """
+    lines = (
+        render_task(request, task, fields) + b"\n"
+        for task in tasks.iterator(chunk_size=STREAM_CHUNK_SIZE)
+    )
+    streaming = StreamingHttpResponse(lines, content_type="application/x-ndjson")
+    streaming["ETag"] = response["ETag"]
+    return streaming
+
+
+class BulkTaskResult(Schema):
+    task: Optional[TaskOutput] = None
+    errors: Optional[dict[str, list[str]]] = None
+
+
+class TaskPage(Schema):
+    items: list[TaskOutput]
+    next_cursor: Optional[str]
+
+
+class ProjectPage(Schema):
+    items: list[ProjectOutput]
+    next_cursor: Optional[str]
+
+
 class ProjectFilterSchema(FilterSchema):
     name: Optional[str] = Field(None, q="name__icontains")
     owner_email: Optional[str] = Field(None, q="owner__email__icontains")
-    member_email: Optional[str] = Field(None, q="members__email__icontains")
+    member_email: Optional[str] = None
+
+    def filter_member_email(self, value: Optional[str]) -> Q:
+        # A semi-join on the membership table rather than a join through
+        # members, so a project with several matching members is returned once.
+        if value is None:
+            return Q()
+        return Q(
+            id__in=Project.members.through.objects.filter(
+                user__email__icontains=value
+            ).values("project_id")
+        )
 
 
 class TaskFilterSchema(FilterSchema):
@@ -86,23 +215,123 @@ class TaskFilterSchema(FilterSchema):
     due_date_lte: Optional[datetime] = Field(None, q="due_date__lte")
 
 
-@router.get("/tasks", url_name="get_tasks", response=list[TaskOutput])
-def get_tasks(request: HttpRequest, filters: TaskFilterSchema = Query(...)):
+class TaskPaginationSchema(Schema):
+    cursor: Optional[str] = None
+    limit: int = Field(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+    sort: Literal[
+        "due_date",
+        "-due_date",
+        "created_at",
+        "-created_at",
+        "status",
+        "-status",
+        "-rank",
+    ] = "due_date"
+
+
+class ProjectPaginationSchema(Schema):
+    cursor: Optional[str] = None
+    limit: int = Field(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+    sort: Literal["created_at", "-created_at"] = "created_at"
+
+
+@router.get("/tasks", url_name="get_tasks", response=TaskPage)
+def get_tasks(
+    request: HttpRequest,
+    response: HttpResponse,
+    filters: TaskFilterSchema = Query(...),
+    pagination: TaskPaginationSchema = Query(...),
+    q: Optional[str] = Query(None, min_length=1, max_length=255),
+    stream: bool = False,
+    fields: Optional[str] = None,
+):
+    fields = parse_fields(TaskOutput, fields)
+    versions = read_versions(request, version_key("tasks"))
+    if cached := not_modified(request, response, versions):
+        return cached
+
     user = request.auth["user"]
+    ordering = get_ordering(pagination.sort)
+    tasks = filters.filter(
+        queries.get_tasks(user=user, fields=with_ordering(fields, ordering))
+    )
 
-    tasks = (
-        filters.filter(queries.get_tasks(user=user))
-        if request.GET
-        else queries.get_tasks(user=user)
+    if q:
+        tasks = queries.search_tasks(tasks, q)
+    elif pagination.sort == "-rank":
+        raise ValidationError("Sorting by rank requires a search query.")
+
+    # Streams every task from the cursor on, limit only applies to pages.
+    if stream:
+        return stream_tasks(
+            request,
+            response,
+            order_keyset(tasks, ordering, pagination.cursor),
+            fields,
+        )
+
+    tasks, next_cursor = paginate_keyset(
+        tasks, ordering=ordering, cursor=pagination.cursor, limit=pagination.limit
     )
 
-    return list(tasks)
+    # The page is assembled from cached fragments around a rendered envelope,
+    # separating items without whitespace like the ORJSONRenderer does.
+    envelope = router.api.renderer.render(
+        request, {"items": [], "next_cursor": next_cursor}, response_status=200
+    )
+    head, tail = force_bytes(envelope).split(b"[]", 1)
+    if fields is None:
+        items = render_task_fragments(request, tasks, versions)
+    else:
+        items = [render_task(request, task, fields) for task in tasks]
+    response.content = b"%s[%s]%s" % (head, b",".join(items), tail)
+
+    return response
+
+
+# Registered before /tasks/{task_id}, which would otherwise match "bulk".
+@router.patch(
+    "/tasks/bulk", url_name="bulk_update_tasks", response=dict[int, BulkTaskResult]
+)
+def bulk_update_tasks(request: HttpRequest, payload: BulkTaskUpdateInput):
+    user = request.auth["user"]
+    changes = payload.dict(exclude_unset=True)
+    task_ids = changes.pop("task_ids")
+
+    with transaction.atomic():
+        results = commands.bulk_update_tasks(user=user, task_ids=task_ids, **changes)
+
+    tasks = [result for result in results.values() if isinstance(result, Task)]
+    prefetch_related_objects(tasks, "attachments")
+
+    return {
+        task_id: {"errors": result.message_dict}
+        if isinstance(result, ValidationError)
+        else {"task": result}
+        for task_id, result in results.items()
+    }
 
 
 @router.get("/tasks/{task_id}", url_name="get_task", response=TaskOutput)
-def get_task(request: HttpRequest, task_id: int):
+def get_task(
+    request: HttpRequest,
+    response: HttpResponse,
+    task_id: int,
+    fields: Optional[str] = None,
+):
+    fields = parse_fields(TaskOutput, fields)
+    versions = read_versions(request, version_key("task", task_id))
+    if cached := not_modified(request, response, versions):
+        return cached
+
     user = request.auth["user"]
-    return queries.get_task(user=user, task_id=task_id)
+    task = queries.get_task(user=user, task_id=task_id, fields=fields)
+    if fields is None:
+        [response.content] = render_task_fragments(request, [task], versions)
+    else:
+        response.content = render_task(request, task, fields)
+
+    return response
 
 
 @router.post("/{id}/tasks", response={201: TaskOutput})
@@ -130,6 +359,30 @@ def create_task(
     return 201, task
 
 
+@router.post(
+    "/{id}/tasks/bulk",
+    url_name="bulk_create_tasks",
+    response={201: list[BulkTaskResult]},
+)
+def bulk_create_tasks(request: HttpRequest, id: int, payload: BulkTaskInput):
+    user = request.auth["user"]
+
+    with transaction.atomic():
+        results = commands.bulk_create_tasks(
+            user=user, project_id=id, tasks=[task.dict() for task in payload.tasks]
+        )
+
+    tasks = [result for result in results if isinstance(result, Task)]
+    prefetch_related_objects(tasks, "attachments")
+
+    return 201, [
+        {"errors": result.message_dict}
+        if isinstance(result, ValidationError)
+        else {"task": result}
+        for result in results
+    ]
+
+
 @router.patch("/tasks/{task_id}", response=TaskOutput)
 def update_task(
     request: HttpRequest,
@@ -163,17 +416,40 @@ def delete_task(request: HttpRequest, response: HttpResponse, task_id: int):
     return 204, None
 
 
-@router.get("/", response=list[ProjectOutput])
-def get_projects(request: HttpRequest, filters: ProjectFilterSchema = Query(...)):
-    user = request.auth["user"]
+@router.get("/", url_name="get_projects", response=ProjectPage)
+def get_projects(
+    request: HttpRequest,
+    response: HttpResponse,
+    filters: ProjectFilterSchema = Query(...),
+    pagination: ProjectPaginationSchema = Query(...),
+    fields: Optional[str] = None,
+):
+    fields = parse_fields(ProjectOutput, fields)
+    versions = read_versions(request, version_key("projects"))
+    if cached := not_modified(request, response, versions):
+        return cached
 
-    projects = (
-        filters.filter(queries.get_user_projects(user=user))
-        if request.GET
-        else queries.get_user_projects(user=user)
+    user = request.auth["user"]
+    ordering = get_ordering(pagination.sort)
+
+    projects, next_cursor = paginate_keyset(
+        filters.filter(
+            queries.get_user_projects(user=user, fields=with_ordering(fields, ordering))
+        ),
+        ordering=ordering,
+        cursor=pagination.cursor,
+        limit=pagination.limit,
     )
 
-    return list(projects)
+    if fields is None:
+        return {"items": projects, "next_cursor": next_cursor}
+
+    items = [dump(request, ProjectOutput, project, fields) for project in projects]
+    return router.api.create_response(
+        request,
+        {"items": items, "next_cursor": next_cursor},
+        temporal_response=response,
+    )
 
 
 @router.post("/", response={201: ProjectOutput})
@@ -189,9 +465,28 @@ def create_project(request: HttpRequest, response: HttpResponse, payload: Projec
 
 
 @router.get("/{id}", url_name="get_project", response=ProjectOutput)
-def get_project(request: HttpRequest, id: int):
+def get_project(
+    request: HttpRequest,
+    response: HttpResponse,
+    id: int,
+    fields: Optional[str] = None,
+):
+    fields = parse_fields(ProjectOutput, fields)
+    versions = read_versions(request, version_key("project", id))
+    if cached := not_modified(request, response, versions):
+        return cached
+
     user = request.auth["user"]
-    return queries.get_project(user=user, project_id=id)
+    project = queries.get_project(user=user, project_id=id, fields=fields)
+
+    if fields is None:
+        return project
+
+    return router.api.create_response(
+        request,
+        dump(request, ProjectOutput, project, fields),
+        temporal_response=response,
+    )
 
 
 @router.patch("/{id}", response=ProjectOutput)
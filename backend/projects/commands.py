@@ -1,37 +1,57 @@
 from typing import Optional
 from datetime import datetime
 
-from guardian.shortcuts import assign_perm
+from django.core.exceptions import ValidationError
+from django.utils.timezone import now
 from ninja import File
+from ninja.errors import HttpError
 from ninja.files import UploadedFile
 
+from app.versions import bump_versions, version_key
 from users.models import User
 from users.queries import get_user_by_id
 from permissions.permissions import (
     Permissions,
+    STANDARD_PERMISSIONS,
+    get_permission_checker,
+    bulk_assign_perms,
     assign_standard_permissions,
-    assign_project_member_permissions,
-    remove_project_member_permissions,
+    bulk_assign_project_member_permissions,
+    bulk_remove_project_member_permissions,
     assign_task_assignee_permissions,
     remove_task_assignee_permissions,
+    bulk_assign_task_assignee_permissions,
+    bulk_remove_task_assignee_permissions,
 )
-from .models import Project, Task, TaskAttachment
+from .models import PENDING_WINDOW, Project, Task, TaskAttachment
 from .queries import get_project, get_task
 from .exceptions import ProjectPermissionDenied
 
 
+def bump_project_versions(*project_ids: int):
+    bump_versions(
+        version_key("projects"), *(version_key("project", id) for id in project_ids)
+    )
+
+
+def bump_task_versions(*task_ids: int):
+    bump_versions(version_key("tasks"), *(version_key("task", id) for id in task_ids))
+
+
 def create_project(user: User, name: str, member_ids: set[int]) -> Project:
     project: Project = Project.objects.create(owner=user, name=name)
 
     # TODO: check if members exist
-    members = User.objects.filter(id__in=member_ids)
+    members = list(User.objects.filter(id__in=member_ids))
     project.members.set(members)
 
-    assign_standard_permissions(user=user, obj=project)
-    assign_perm(Permissions.MANAGE_TASKS, user, project)
-
-    for member in members:
-        assign_project_member_permissions(user=member, project=project)
+    bulk_assign_perms(
+        perms=(*STANDARD_PERMISSIONS, Permissions.MANAGE_TASKS),
+        users=[user],
+        objects=[project],
+    )
+    bulk_assign_project_member_permissions(users=members, project=project)
+    bump_project_versions(project.id)
 
     return project
 
@@ -41,23 +61,23 @@ def update_project(
 ) -> Project:
     project: Project = get_project(user=user, project_id=project_id)
 
-    if not user.has_perm(perm=Permissions.UPDATE, obj=project):
+    if not get_permission_checker(user).has_perm(Permissions.UPDATE, project):
         raise ProjectPermissionDenied
 
-    for previous_member in project.members.exclude(
-        id__in=member_ids + [project.owner.id]
-    ):
-        remove_project_member_permissions(user=previous_member, project=project)
+    bulk_remove_project_member_permissions(
+        users=project.members.exclude(id__in={*member_ids, project.owner_id}),
+        project=project,
+    )
 
     project.name = name
-    members = User.objects.filter(id__in=member_ids)
+    members = list(User.objects.filter(id__in=member_ids))
     project.members.set(members)
 
-    for member in members:
-        assign_project_member_permissions(user=member, project=project)
+    bulk_assign_project_member_permissions(users=members, project=project)
 
     project.full_clean()
     project.save()
+    bump_project_versions(project.id)
 
     return project
 
@@ -65,10 +85,29 @@ def update_project(
 def delete_project(user: User, project_id: int):
     project: Project = get_project(user=user, project_id=project_id)
 
-    if not user.has_perm(perm=Permissions.DELETE, obj=project):
+    if not get_permission_checker(user).has_perm(Permissions.DELETE, project):
         raise ProjectPermissionDenied
 
+    task_ids = list(project.tasks.values_list("id", flat=True))
     project.delete()
+    bump_task_versions(*task_ids)
+    bump_project_versions(project_id)
+
+
+def schedule_task_notifications(task: Task, rescheduled: bool = False):
+    # A new due date gets a fresh pair of reminders.
+    if rescheduled:
+        task.pending_notification_sent = False
+        task.overdue_notification_sent = False
+
+    task.next_notification_at = None
+    if task.status == Task.StatusChoice.DONE or not task.due_date:
+        return
+
+    if not task.pending_notification_sent and task.due_date > now():
+        task.next_notification_at = task.due_date - PENDING_WINDOW
+    elif not task.overdue_notification_sent:
+        task.next_notification_at = task.due_date
 
 
 def create_task(
@@ -82,9 +121,10 @@ def create_task(
 ) -> Task:
     project: Project = get_project(user=user, project_id=project_id)
 
+    permissions = get_permission_checker(user)
     if not (
-        user.has_perm(Permissions.UPDATE, project)
-        or user.has_perm(Permissions.MANAGE_TASKS, project)
+        permissions.has_perm(Permissions.UPDATE, project)
+        or permissions.has_perm(Permissions.MANAGE_TASKS, project)
     ):
         raise ProjectPermissionDenied
 
@@ -99,6 +139,7 @@ def create_task(
     )
 
     task.full_clean()
+    schedule_task_notifications(task)
     task.save()
 
     assign_standard_permissions(user=user, obj=task)
@@ -106,9 +147,69 @@ def create_task(
     if task.assignee and task.assignee.id != user.id:
         assign_task_assignee_permissions(task.assignee, task)
 
+    bump_task_versions(task.id)
+
     return task
 
 
+def bulk_create_tasks(
+    user: User, project_id: int, tasks: list[dict]
+) -> list[Task | ValidationError]:
+    project: Project = get_project(user=user, project_id=project_id)
+
+    permissions = get_permission_checker(user)
+    if not (
+        permissions.has_perm(Permissions.UPDATE, project)
+        or permissions.has_perm(Permissions.MANAGE_TASKS, project)
+    ):
+        raise ProjectPermissionDenied
+
+    assignees = User.objects.in_bulk(
+        {task["assignee_id"] for task in tasks if task.get("assignee_id")}
+    )
+
+    results: list[Task | ValidationError] = []
+    created: list[Task] = []
+    for fields in tasks:
+        assignee_id = fields.pop("assignee_id", None)
+        task = Task(
+            created_by=user,
+            project=project,
+            assignee=assignees.get(assignee_id),
+            **fields,
+        )
+
+        try:
+            if assignee_id and assignee_id not in assignees:
+                raise ValidationError({"assignee_id": "User does not exist."})
+            # Foreign keys are resolved above, validating them again would
+            # query the database once per task.
+            task.full_clean(
+                exclude=["project", "created_by", "assignee"],
+                validate_unique=False,
+                validate_constraints=False,
+            )
+        except ValidationError as error:
+            results.append(error)
+            continue
+
+        schedule_task_notifications(task)
+        results.append(task)
+        created.append(task)
+
+    Task.objects.bulk_create(created)
+
+    bulk_assign_perms(perms=STANDARD_PERMISSIONS, users=[user], objects=created)
+    bulk_assign_task_assignee_permissions(
+        (task.assignee, task)
+        for task in created
+        if task.assignee and task.assignee.id != user.id
+    )
+    bump_task_versions(*(task.id for task in created))
+
+    return results
+
+
 def update_task(
     user: User,
     task_id: int,
@@ -119,9 +220,11 @@ def update_task(
     due_date: Optional[datetime] = None,
 ) -> Task:
     task: Task = get_task(user=user, task_id=task_id)
+
+    permissions = get_permission_checker(user)
     if not (
-        user.has_perm(Permissions.UPDATE, task)
-        or user.has_perm(Permissions.MANAGE_TASKS, task.project)
+        permissions.has_perm(Permissions.UPDATE, task)
+        or permissions.has_perm(Permissions.MANAGE_TASKS, task.project)
     ):
         raise ProjectPermissionDenied
 
@@ -130,7 +233,9 @@ def update_task(
         and task.assignee.id != task.created_by.id
         and task.assignee.id != assignee_id
     ):
-        remove_task_assignee_permissions(task.assignee)
+        remove_task_assignee_permissions(task.assignee, task)
+
+    rescheduled = task.due_date != due_date
 
     task.title = title
     task.description = description
@@ -139,25 +244,113 @@ def update_task(
     task.assignee = get_user_by_id(uid=assignee_id) if assignee_id else None
 
     task.full_clean()
+    schedule_task_notifications(task, rescheduled=rescheduled)
     task.save()
 
-    if task.assignee:
-        assign_perm(Permissions.UPDATE, task.assignee, task)
+    if task.assignee and task.assignee.id != task.created_by.id:
+        assign_task_assignee_permissions(task.assignee, task)
+
+    bump_task_versions(task.id)
 
     return task
 
 
+def bulk_update_tasks(
+    user: User, task_ids: set[int], **changes
+) -> dict[int, Task | ValidationError]:
+    # Nothing would change, but every task would be reported as updated and
+    # its cached versions dropped.
+    if not changes:
+        raise HttpError(400, "No changes given.")
+
+    tasks = Task.objects.select_related("project", "assignee", "created_by").in_bulk(
+        task_ids
+    )
+
+    assignee = None
+    if changes.get("assignee_id"):
+        assignee = User.objects.filter(id=changes["assignee_id"]).first()
+        if assignee is None:
+            raise ValidationError({"assignee_id": "User does not exist."})
+
+    permissions = get_permission_checker(user)
+    permissions.prefetch(*tasks.values(), *(task.project for task in tasks.values()))
+
+    results: dict[int, Task | ValidationError] = {}
+    updated: list[Task] = []
+    removed_grants, assigned_grants = [], []
+    for task_id in task_ids:
+        task = tasks.get(task_id)
+        # Missing and forbidden tasks get the same error, so the results do
+        # not tell which task ids exist.
+        if task is None or not (
+            permissions.has_perm(Permissions.UPDATE, task)
+            or permissions.has_perm(Permissions.MANAGE_TASKS, task.project)
+        ):
+            results[task_id] = ValidationError(
+                {"task_id": "Task does not exist or access denied."}
+            )
+            continue
+
+        previous_assignee = task.assignee
+        rescheduled = "due_date" in changes and task.due_date != changes["due_date"]
+        for field, value in changes.items():
+            setattr(task, field, value)
+        if "assignee_id" in changes:
+            task.assignee = assignee
+
+        try:
+            task.clean_fields(exclude=["project", "created_by", "assignee"])
+            # Only a changed due date has to be in the future, otherwise
+            # overdue tasks could never be closed in bulk.
+            if "due_date" in changes:
+                task.clean()
+        except ValidationError as error:
+            results[task_id] = error
+            continue
+
+        schedule_task_notifications(task, rescheduled=rescheduled)
+        results[task_id] = task
+        updated.append(task)
+
+        if previous_assignee != task.assignee:
+            if previous_assignee and previous_assignee.id != task.created_by_id:
+                removed_grants.append((previous_assignee, task))
+            if task.assignee and task.assignee.id != task.created_by_id:
+                assigned_grants.append((task.assignee, task))
+
+    if updated:
+        Task.objects.bulk_update(
+            updated,
+            fields=[
+                *changes,
+                "pending_notification_sent",
+                "overdue_notification_sent",
+                "next_notification_at",
+            ],
+        )
+
+    bulk_remove_task_assignee_permissions(removed_grants)
+    bulk_assign_task_assignee_permissions(assigned_grants)
+    bump_task_versions(*(task.id for task in updated))
+
+    return results
+
+
 def delete_task(user: User, task_id: int):
     task: Task = get_task(user=user, task_id=task_id)
 
+    permissions = get_permission_checker(user)
     if not (
-        user.has_perm(Permissions.DELETE, task)
-        or user.has_perm(Permissions.MANAGE_TASKS, task.project)
+        permissions.has_perm(Permissions.DELETE, task)
+        or permissions.has_perm(Permissions.MANAGE_TASKS, task.project)
     ):
         raise ProjectPermissionDenied
 
     task.delete()
+    bump_task_versions(task_id)
 
 
 def create_task_attachment(file: File[UploadedFile], task: Task):
     TaskAttachment.objects.create(task=task, file=file)
+    bump_task_versions(task.id)
@@ -0,0 +1,54 @@
+from typing import Callable
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpRequest
+
+from app.versions import get_versions, version_key
+from .models import Task
+
+
+def fragment_key(task_id: int) -> str:
+    return f"fragment:task:{task_id}"
+
+
+def get_task_fragments(
+    request: HttpRequest,
+    tasks: list[Task],
+    render: Callable[[Task], bytes],
+    guard: dict[str, int],
+) -> list[bytes]:
+    """
+    Returns the rendered JSON of every task, rendering only the tasks whose
+    version changed since their fragment was cached.
+
+    guard holds versions read before the tasks were queried. If any of them
+    moved since, the rows may predate a change whose version is already
+    bumped, so nothing rendered from them is cached.
+    """
+    version_keys = {task.id: version_key("task", task.id) for task in tasks}
+    values = cache.get_many(
+        [*guard, *version_keys.values(), *map(fragment_key, version_keys)]
+    )
+    versions = get_versions(*version_keys.values(), cached=values)
+
+    # Attachment URLs are absolute, so fragments are also tied to the host.
+    origin = request.build_absolute_uri("/")
+    fresh = all(values.get(key) == version for key, version in guard.items())
+
+    fragments, rendered = [], {}
+    for task in tasks:
+        tag = (versions[version_keys[task.id]], origin)
+        cached = values.get(fragment_key(task.id))
+        if cached is not None and cached[0] == tag:
+            fragments.append(cached[1])
+            continue
+
+        fragment = render(task)
+        fragments.append(fragment)
+        rendered[fragment_key(task.id)] = (tag, fragment)
+
+    if rendered and fresh:
+        cache.set_many(rendered, timeout=settings.TASK_FRAGMENT_TTL)
+
+    return fragments
@@ -0,0 +1,103 @@
+from datetime import timedelta
+from time import perf_counter
+from uuid import uuid4
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils.timezone import now
+
+from users.models import User
+from projects.models import Project, Task
+
+
+class Command(BaseCommand):
+    help = (
+        "Times the overdue/pending notification scans while DONE and already "
+        "notified tasks accumulate. All rows are rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--candidates", type=int, default=100)
+        parser.add_argument(
+            "--backlog", type=int, nargs="+", default=[0, 10_000, 100_000]
+        )
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(
+        self, *args, candidates: int, backlog: list[int], repeat: int, **options
+    ):
+        with transaction.atomic():
+            user = User.objects.create(email=f"benchmark-{uuid4()}@example.com")
+            project = Project.objects.create(owner=user, name="Benchmark")
+            at = now()
+
+            self.create_tasks(
+                user,
+                project,
+                candidates,
+                lambda i: {"due_date": at - timedelta(minutes=i % 60 + 1)},
+            )
+            self.create_tasks(
+                user,
+                project,
+                candidates,
+                lambda i: {"due_date": at + timedelta(minutes=i % 60 + 1)},
+            )
+
+            created = 0
+            self.stdout.write(f"{'backlog':>10} {'overdue ms':>12} {'pending ms':>12}")
+            for size in sorted(backlog):
+                self.create_tasks(user, project, size - created, self.backlog_task(at))
+                created = size
+                self.analyze()
+
+                overdue = self.time(Task.read_model.get_overdue_to_notify(), repeat)
+                pending = self.time(Task.read_model.get_pending_to_notify(), repeat)
+                self.stdout.write(f"{size:>10} {overdue:>12.3f} {pending:>12.3f}")
+
+            self.stdout.write(Task.read_model.get_overdue_to_notify().explain())
+            self.stdout.write(Task.read_model.get_pending_to_notify().explain())
+
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def backlog_task(at):
+        # Alternates between finished tasks and tasks that were already
+        # notified, with due dates spread around the scan windows.
+        def fields(i: int) -> dict:
+            due_date = at + timedelta(minutes=i % 240 - 120)
+            if i % 2:
+                return {"due_date": due_date, "status": Task.StatusChoice.DONE}
+            return {
+                "due_date": due_date,
+                "overdue_notification_sent": True,
+                "pending_notification_sent": True,
+            }
+
+        return fields
+
+    @staticmethod
+    def create_tasks(user, project, count: int, fields):
+        Task.objects.bulk_create(
+            (
+                Task(created_by=user, project=project, title="Benchmark", **fields(i))
+                for i in range(count)
+            ),
+            batch_size=5000,
+        )
+
+    @staticmethod
+    def analyze():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "ANALYZE projects_task"
+                if connection.vendor == "postgresql"
+                else "ANALYZE"
+            )
+
+    @staticmethod
+    def time(queryset, repeat: int) -> float:
+        start = perf_counter()
+        for _ in range(repeat):
+            list(queryset.values_list("id", flat=True))
+        return (perf_counter() - start) / repeat * 1000
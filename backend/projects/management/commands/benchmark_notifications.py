@@ -0,0 +1,112 @@
+from datetime import timedelta
+from time import perf_counter
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+from django.utils.timezone import now
+
+from users.models import User
+from projects.models import Project, Task
+from outbox.tasks import drain_outbox
+from outbox.management.smtp_sink import SMTPSink
+from projects.tasks import (
+    get_recipient_list,
+    overdue_subject,
+    send_notification_chunk,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Sends overdue notifications for generated tasks to a local SMTP sink, "
+        "comparing the batched sweep drained through the outbox with one "
+        "send_mail and save() per task. "
+        "All rows are rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tasks", type=int, default=1000)
+        parser.add_argument(
+            "--latency",
+            type=float,
+            default=0.0,
+            help="Seconds the sink waits before each SMTP reply.",
+        )
+        parser.add_argument(
+            "--digest",
+            action="store_true",
+            help="Sends the batched sweep as one digest per recipient.",
+        )
+
+    def handle(self, *args, tasks: int, latency: float, digest: bool, **options):
+        with (
+            SMTPSink(latency=latency) as sink,
+            override_settings(
+                EMAIL_BACKEND="django.core.mail.backends.smtp.EmailBackend",
+                EMAIL_HOST="127.0.0.1",
+                EMAIL_PORT=sink.port,
+                NOTIFICATION_DIGEST=digest,
+            ),
+        ):
+            for name, sweep in (
+                ("per task", self.send_per_task),
+                ("batched", self.send_batched),
+            ):
+                with transaction.atomic():
+                    self.create_overdue_tasks(tasks)
+                    messages, connections = sink.messages, sink.connections
+
+                    start = perf_counter()
+                    sweep()
+                    elapsed = perf_counter() - start
+
+                    self.stdout.write(
+                        f"{name:>10}: {elapsed:8.3f}s, "
+                        f"{sink.messages - messages} messages over "
+                        f"{sink.connections - connections} connections"
+                    )
+                    transaction.set_rollback(True)
+
+    @staticmethod
+    def create_overdue_tasks(count: int):
+        owner = User.objects.create(email=f"owner-{uuid4()}@example.com")
+        assignee = User.objects.create(email=f"assignee-{uuid4()}@example.com")
+        project = Project.objects.create(owner=owner, name="Benchmark")
+        Task.objects.bulk_create(
+            (
+                Task(
+                    created_by=owner,
+                    assignee=assignee,
+                    project=project,
+                    title=f"Task {i}",
+                    due_date=now() - timedelta(minutes=1),
+                )
+                for i in range(count)
+            ),
+            batch_size=5000,
+        )
+
+    @staticmethod
+    def send_batched():
+        # Runs the sweep's subtask and the drainer in process, so that the
+        # measurement does not depend on a worker.
+        ids = Task.read_model.get_overdue_to_notify().values_list("id", flat=True)
+        send_notification_chunk("overdue", min(ids), max(ids))
+        drain_outbox()
+
+    @staticmethod
+    def send_per_task():
+        # The sweep as it was before batching, kept as a baseline.
+        for task in Task.read_model.get_overdue_to_notify():
+            send_mail(
+                subject=overdue_subject(task),
+                message="Follow this link to see the tasks: [PROJECT_URL]",
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                recipient_list=get_recipient_list(task),
+            )
+            task.overdue_notification_sent = True
+            task.save()
@@ -0,0 +1,74 @@
+import json
+from datetime import timedelta
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.utils.timezone import now
+from ninja.renderers import JSONRenderer
+
+from app.renderers import ORJSONRenderer
+from projects.models import Task
+
+
+class Command(BaseCommand):
+    help = (
+        "Renders task pages of growing size with the default JSONRenderer and "
+        "the ORJSONRenderer and checks that both produce the same document. "
+        "No rows are created."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tasks", type=int, nargs="+", default=[1000, 10_000])
+        parser.add_argument("--repeat", type=int, default=10)
+
+    def handle(self, *args, tasks: list[int], repeat: int, **options):
+        request = RequestFactory().get("/")
+        renderers = {"json": JSONRenderer(), "orjson": ORJSONRenderer()}
+
+        self.stdout.write(
+            f"{'tasks':>8} {'json ms':>10} {'orjson ms':>10} {'speedup':>8}"
+        )
+        for count in tasks:
+            data = self.task_page(count)
+
+            timings, documents = {}, []
+            for name, renderer in renderers.items():
+                start = perf_counter()
+                for _ in range(repeat):
+                    content = renderer.render(request, data, response_status=200)
+                timings[name] = (perf_counter() - start) / repeat * 1000
+                documents.append(json.loads(content))
+
+            if documents[0] != documents[1]:
+                self.stderr.write(f"Rendered documents differ for {count} tasks")
+
+            self.stdout.write(
+                f"{count:>8} {timings['json']:>10.2f} {timings['orjson']:>10.2f} "
+                f"{timings['json'] / timings['orjson']:>7.1f}x"
+            )
+
+    @staticmethod
+    def task_page(count: int) -> dict:
+        # Shaped like TaskPage.model_dump(), which is what the renderer gets.
+        at = now()
+        user = {"id": 1, "email": "benchmark@example.com"}
+        return {
+            "items": [
+                {
+                    "id": i,
+                    "title": f"Task {i}",
+                    "description": "Lorem ipsum dolor sit amet. " * 4,
+                    "attachments": [
+                        f"http://testserver/files/task_attachments/{i}.pdf"
+                    ],
+                    "status": Task.StatusChoice(i % 4 + 1),
+                    "assignee": user if i % 2 else None,
+                    "due_date": at + timedelta(hours=i, microseconds=i),
+                    "created_by": user,
+                    "created_at": at - timedelta(minutes=i),
+                }
+                for i in range(count)
+            ],
+            "next_cursor": "benchmark",
+        }
@@ -0,0 +1,63 @@
+# Generated by Django 5.2 on 2026-10-18 08:45
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+SEARCH_VECTOR = """
+    setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A')
+    || setweight(to_tsvector('english', coalesce(NEW.description, '')), 'B')
+"""
+
+CREATE_SEARCH_VECTOR_TRIGGER = f"""
+CREATE FUNCTION projects_task_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := {SEARCH_VECTOR};
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER projects_task_search_vector_trigger
+BEFORE INSERT OR UPDATE OF title, description, search_vector ON projects_task
+FOR EACH ROW EXECUTE FUNCTION projects_task_search_vector_update();
+
+CREATE INDEX projects_task_search_vector_idx
+ON projects_task USING gin (search_vector);
+
+UPDATE projects_task SET search_vector = NULL;
+"""
+
+DROP_SEARCH_VECTOR_TRIGGER = """
+DROP INDEX IF EXISTS projects_task_search_vector_idx;
+DROP TRIGGER IF EXISTS projects_task_search_vector_trigger ON projects_task;
+DROP FUNCTION IF EXISTS projects_task_search_vector_update();
+"""
+
+
+def run_on_postgresql(sql):
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor == "postgresql":
+            schema_editor.execute(sql)
+
+    return operation
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("projects", "0002_task_project_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="task",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        # The trigger and GIN index only exist on PostgreSQL; other backends
+        # (the SQLite test configuration) fall back to icontains filtering.
+        migrations.RunPython(
+            run_on_postgresql(CREATE_SEARCH_VECTOR_TRIGGER),
+            run_on_postgresql(DROP_SEARCH_VECTOR_TRIGGER),
+        ),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations
+
+# Matches the UPPER(col::text) LIKE UPPER(%s) predicate of icontains lookups.
+CREATE_NAME_TRIGRAM_INDEX = """
+CREATE INDEX projects_project_name_trgm_idx
+ON projects_project USING gin ((UPPER(name::text)) gin_trgm_ops);
+"""
+
+DROP_NAME_TRIGRAM_INDEX = "DROP INDEX IF EXISTS projects_project_name_trgm_idx;"
+
+
+def run_on_postgresql(sql):
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor == "postgresql":
+            schema_editor.execute(sql)
+
+    return operation
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("projects", "0003_task_search_vector"),
+        ("users", "0005_user_email_trigram_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_on_postgresql(CREATE_NAME_TRIGRAM_INDEX),
+            run_on_postgresql(DROP_NAME_TRIGRAM_INDEX),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2 on 2026-10-18 08:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("projects", "0004_project_name_trigram_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(
+                condition=models.Q(
+                    models.Q(("status", 4), _negated=True),
+                    ("overdue_notification_sent", False),
+                ),
+                fields=["due_date"],
+                name="task_overdue_to_notify_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(
+                condition=models.Q(
+                    models.Q(("status", 4), _negated=True),
+                    ("pending_notification_sent", False),
+                ),
+                fields=["due_date"],
+                name="task_pending_to_notify_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2 on 2026-10-18 08:51
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, Q
+from django.utils.timezone import now
+
+DONE = 4
+PENDING_WINDOW = timedelta(hours=1)
+
+
+def schedule_open_tasks(apps, schema_editor):
+    Task = apps.get_model("projects", "Task")
+    tasks = Task.objects.exclude(status=DONE)
+    at = now()
+
+    tasks.filter(pending_notification_sent=False, due_date__gt=at).update(
+        next_notification_at=F("due_date") - PENDING_WINDOW
+    )
+    tasks.filter(
+        Q(pending_notification_sent=True) | Q(due_date__lte=at),
+        overdue_notification_sent=False,
+    ).update(next_notification_at=F("due_date"))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("projects", "0005_task_notification_scan_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="task",
+            name="next_notification_at",
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(
+                condition=models.Q(("next_notification_at__isnull", False)),
+                fields=["next_notification_at"],
+                name="task_next_notification_at_idx",
+            ),
+        ),
+        migrations.RunPython(schedule_open_tasks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+from django.db import migrations
+
+# Django's save() lists every column in its UPDATE, so a trigger on
+# "UPDATE OF title, description" would still fire for status-only edits. The
+# WHEN clause recomputes the vector only when the text actually changed, or
+# when a save() that loaded search_vector writes it back as NULL.
+CREATE_SEARCH_VECTOR_TRIGGERS = """
+DROP TRIGGER IF EXISTS projects_task_search_vector_trigger ON projects_task;
+
+CREATE TRIGGER projects_task_search_vector_insert_trigger
+BEFORE INSERT ON projects_task
+FOR EACH ROW EXECUTE FUNCTION projects_task_search_vector_update();
+
+CREATE TRIGGER projects_task_search_vector_update_trigger
+BEFORE UPDATE OF title, description, search_vector ON projects_task
+FOR EACH ROW
+WHEN (
+    OLD.title IS DISTINCT FROM NEW.title
+    OR OLD.description IS DISTINCT FROM NEW.description
+    OR NEW.search_vector IS NULL
+)
+EXECUTE FUNCTION projects_task_search_vector_update();
+"""
+
+DROP_SEARCH_VECTOR_TRIGGERS = """
+DROP TRIGGER IF EXISTS projects_task_search_vector_insert_trigger ON projects_task;
+DROP TRIGGER IF EXISTS projects_task_search_vector_update_trigger ON projects_task;
+
+CREATE TRIGGER projects_task_search_vector_trigger
+BEFORE INSERT OR UPDATE OF title, description, search_vector ON projects_task
+FOR EACH ROW EXECUTE FUNCTION projects_task_search_vector_update();
+"""
+
+
+def run_on_postgresql(sql):
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor == "postgresql":
+            schema_editor.execute(sql)
+
+    return operation
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("projects", "0006_task_next_notification_at"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_on_postgresql(CREATE_SEARCH_VECTOR_TRIGGERS),
+            run_on_postgresql(DROP_SEARCH_VECTOR_TRIGGERS),
+        ),
+    ]
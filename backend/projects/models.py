@@ -1,6 +1,8 @@
 from datetime import timedelta
 
 from django.db import models
+from django.db.models import Q
+from django.contrib.postgres.search import SearchVectorField
 from django.db.models.query import QuerySet
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
@@ -27,34 +29,65 @@ class Project(models.Model):
             (Permissions.DELETE, "Delete Project"),
             (Permissions.MANAGE_TASKS, "Manage Tasks"),
         )
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="project_created_at_id_idx"),
+        ]
 
     def __str__(self):
         return self.name
 
 
+class TaskStatusChoice(models.IntegerChoices):
+    TO_DO = 1, "To do"
+    IN_PROGRESS = 2, "In progress"
+    REVIEW = 3, "Review"
+    DONE = 4, "Done"
+
+
+# Shared by the read model and the partial indexes on Task, so that the
+# notification scans compile to exactly the indexed predicates.
+NOT_DONE = ~Q(status=TaskStatusChoice.DONE.value)
+OVERDUE_NOT_NOTIFIED = NOT_DONE & Q(overdue_notification_sent=False)
+PENDING_NOT_NOTIFIED = NOT_DONE & Q(pending_notification_sent=False)
+
+PENDING_WINDOW = timedelta(hours=1)
+
+
 class TaskReadModel(QuerySet):
-    def get_pending(self: QuerySet["Task"]) -> QuerySet["Task"]:
-        soon = now() + timedelta(hours=1)
+    def get_pending(self: QuerySet["Task"], at=None) -> QuerySet["Task"]:
+        at = at or now()
         return self.filter(
-            due_date__lte=soon,
-            due_date__gte=now(),
-        ).exclude(status=Task.StatusChoice.DONE.value)
+            NOT_DONE, due_date__gte=at, due_date__lte=at + PENDING_WINDOW
+        )
+
+    def get_overdue(self: QuerySet["Task"], at=None) -> QuerySet["Task"]:
+        return self.filter(NOT_DONE, due_date__lte=at or now())
 
-    def get_overdue(self: QuerySet["Task"]) -> QuerySet["Task"]:
-        return self.filter(due_date__lte=now()).exclude(
-            status=Task.StatusChoice.DONE.value
+    def get_pending_to_notify(self: QuerySet["Task"], at=None) -> QuerySet["Task"]:
+        at = at or now()
+        return self.filter(
+            PENDING_NOT_NOTIFIED, due_date__gte=at, due_date__lte=at + PENDING_WINDOW
         )
 
+    def get_overdue_to_notify(self: QuerySet["Task"], at=None) -> QuerySet["Task"]:
+        return self.filter(OVERDUE_NOT_NOTIFIED, due_date__lte=at or now())
+
+    def get_notification_due(self: QuerySet["Task"], at=None) -> QuerySet["Task"]:
+        return self.filter(next_notification_at__lte=at or now())
+
+
+class TaskManager(models.Manager):
+    def get_queryset(self) -> QuerySet["Task"]:
+        # The search vector is only ever filtered on. Leaving it out keeps it
+        # off the wire and out of save(), which would rewrite it unchanged.
+        return super().get_queryset().defer("search_vector")
+
 
 class Task(models.Model):
-    objects = models.Manager()
-    read_model = TaskReadModel.as_manager()
+    objects = TaskManager()
+    read_model = TaskManager.from_queryset(TaskReadModel)()
 
-    class StatusChoice(models.IntegerChoices):
-        TO_DO = 1, "To do"
-        IN_PROGRESS = 2, "In progress"
-        REVIEW = 3, "Review"
-        DONE = 4, "Done"
+    StatusChoice = TaskStatusChoice
 
     title = models.CharField(max_length=255)
     description = models.TextField(max_length=10000, blank=True, null=True)
@@ -77,6 +110,12 @@ class Task(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     pending_notification_sent = models.BooleanField(default=False)
     overdue_notification_sent = models.BooleanField(default=False)
+    # When the next reminder is due, maintained by projects.commands and
+    # cleared once there is nothing left to send.
+    next_notification_at = models.DateTimeField(null=True, editable=False)
+    # Maintained by database triggers on PostgreSQL, see migrations 0003 and
+    # 0007. Deferred by TaskManager.
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         default_permissions = ()
@@ -85,6 +124,26 @@ class Task(models.Model):
             (Permissions.UPDATE, "Update Task"),
             (Permissions.DELETE, "Delete Task"),
         )
+        indexes = [
+            models.Index(fields=["due_date", "id"], name="task_due_date_id_idx"),
+            models.Index(fields=["created_at", "id"], name="task_created_at_id_idx"),
+            models.Index(fields=["status", "id"], name="task_status_id_idx"),
+            models.Index(
+                fields=["due_date"],
+                condition=OVERDUE_NOT_NOTIFIED,
+                name="task_overdue_to_notify_idx",
+            ),
+            models.Index(
+                fields=["due_date"],
+                condition=PENDING_NOT_NOTIFIED,
+                name="task_pending_to_notify_idx",
+            ),
+            models.Index(
+                fields=["next_notification_at"],
+                condition=Q(next_notification_at__isnull=False),
+                name="task_next_notification_at_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.title
@@ -102,3 +161,24 @@ class TaskAttachment(models.Model):
 
     def filename(self):
         return self.file.name.split("/")[-1]
+
+
+class TaskDigestEntry(models.Model):
+    """
+    A task waiting to be listed in a recipient's digest email. Chunks of a
+    notification sweep add entries, one step after the sweep sends a single
+    digest per recipient and deletes them.
+    """
+
+    recipient = models.EmailField()
+    # The notification kind, e.g. "overdue".
+    kind = models.CharField(max_length=50)
+    task = models.ForeignKey(Task, related_name="+", on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["kind", "recipient"], name="task_digest_entry_kind_idx"
+            ),
+        ]
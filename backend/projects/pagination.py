@@ -0,0 +1,112 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from datetime import datetime
+from functools import reduce
+from operator import or_
+from typing import Optional
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.db.models.query import QuerySet
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def get_ordering(sort: str) -> tuple[str, str]:
+    # Every sort key is paired with "id" so that the ordering is total
+    # and matches the composite (key, id) indexes declared on the models.
+    direction = "-" if sort.startswith("-") else ""
+    return (sort, f"{direction}id")
+
+
+def _encode_value(value):
+    # Full isoformat keeps microseconds, which DjangoJSONEncoder truncates.
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Unsupported cursor value: {value!r}")
+
+
+def encode_cursor(values: list) -> str:
+    raw = json.dumps(values, default=_encode_value).encode()
+    return urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(queryset: QuerySet, ordering: tuple[str, ...], cursor: str) -> list:
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        values = json.loads(urlsafe_b64decode(cursor + padding))
+    except (BinasciiError, UnicodeDecodeError, ValueError):
+        raise ValidationError("Invalid cursor.")
+
+    if not isinstance(values, list) or len(values) != len(ordering):
+        raise ValidationError("Invalid cursor.")
+
+    # Keyset comparisons cannot be made against NULL.
+    if None in values:
+        raise ValidationError("Invalid cursor.")
+
+    return [
+        _to_python(queryset, field.lstrip("-"), value)
+        for field, value in zip(ordering, values)
+    ]
+
+
+def _to_python(queryset: QuerySet, name: str, value):
+    if name in queryset.query.annotations:
+        field = queryset.query.annotations[name].output_field
+    else:
+        field = queryset.model._meta.get_field(name)
+
+    try:
+        python_value = field.to_python(value)
+    except (ValidationError, TypeError, ValueError):
+        raise ValidationError("Invalid cursor.")
+
+    if python_value is None:
+        raise ValidationError("Invalid cursor.")
+    return python_value
+
+
+def _after(ordering: tuple[str, ...], values: list) -> Q:
+    # (a, b) > (x, y)  <=>  a > x OR (a = x AND b > y)
+    conditions = []
+    for i, field in enumerate(ordering):
+        name = field.lstrip("-")
+        lookup = "lt" if field.startswith("-") else "gt"
+        equal = {f.lstrip("-"): value for f, value in zip(ordering[:i], values)}
+        conditions.append(Q(**equal, **{f"{name}__{lookup}": values[i]}))
+    return reduce(or_, conditions)
+
+
+def order_keyset(
+    queryset: QuerySet, ordering: tuple[str, ...], cursor: Optional[str] = None
+) -> QuerySet:
+    queryset = queryset.order_by(*ordering)
+
+    if cursor:
+        queryset = queryset.filter(
+            _after(ordering, decode_cursor(queryset, ordering, cursor))
+        )
+
+    return queryset
+
+
+def paginate_keyset(
+    queryset: QuerySet,
+    ordering: tuple[str, ...],
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+) -> tuple[list, Optional[str]]:
+    queryset = order_keyset(queryset, ordering, cursor)
+
+    items = list(queryset[: limit + 1])
+    if len(items) <= limit:
+        return items, None
+
+    items = items[:limit]
+    last = items[-1]
+    return items, encode_cursor(
+        [getattr(last, field.lstrip("-")) for field in ordering]
+    )
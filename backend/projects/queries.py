@@ -1,44 +1,138 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import F, FloatField, Prefetch, Q, Value
+from django.db.models.query import QuerySet
 from django.shortcuts import get_object_or_404
-from guardian.shortcuts import get_objects_for_user
+from typing import Optional
 
 from users.models import User
-from permissions.permissions import Permissions
+from permissions.models import Visibility
+from permissions.permissions import Permissions, get_permission_checker
 from .models import Project, Task
 from .exceptions import ProjectPermissionDenied
 
 
-def get_user_projects(user: User):
-    return get_objects_for_user(
-        user=user, perms=Permissions.VIEW, klass=Project, with_superuser=True
+# Users are only ever output as their id and email.
+USER_COLUMNS = ("id", "email")
+
+
+def select_project_fields(
+    projects: QuerySet[Project], fields: Optional[set[str]] = None
+) -> QuerySet[Project]:
+    """
+    Loads what the given output fields need, or everything for None.
+    Unrequested members are not prefetched.
+    """
+    if fields is None:
+        return projects.prefetch_related("members")
+
+    columns = {"id", *fields} - {"members", "owner_id"}
+    if "owner_id" in fields:
+        columns.add("owner")
+    projects = projects.only(*columns)
+
+    if "members" in fields:
+        projects = projects.prefetch_related(
+            Prefetch("members", queryset=User.objects.only(*USER_COLUMNS))
+        )
+    return projects
+
+
+def select_task_fields(
+    tasks: QuerySet[Task], fields: Optional[set[str]] = None
+) -> QuerySet[Task]:
+    """
+    Loads what the given output fields need, or everything for None.
+    Unrequested users are not joined and attachments not prefetched.
+    """
+    if fields is None:
+        return tasks.select_related("assignee", "created_by").prefetch_related(
+            "attachments"
+        )
+
+    relations = {"assignee", "created_by"} & fields
+    columns = {"id", *fields} - {"attachments"}
+    columns.update(
+        f"{relation}__{column}" for relation in relations for column in USER_COLUMNS
     )
+    # select_related() without arguments would join every relation.
+    if relations:
+        tasks = tasks.select_related(*relations)
+    tasks = tasks.only(*columns)
+
+    if "attachments" in fields:
+        tasks = tasks.prefetch_related("attachments")
+    return tasks
+
 
+def get_user_projects(user: User, fields: Optional[set[str]] = None):
+    projects = select_project_fields(Project.objects.all(), fields)
 
-def get_project(user: User, project_id: int) -> Project:
-    project: Project = get_object_or_404(Project, id=project_id)
+    if user.is_superuser:
+        return projects
+
+    return projects.filter(
+        id__in=Visibility.objects.filter(user=user, task__isnull=True).values(
+            "project_id"
+        )
+    )
 
-    if not user.has_perm(perm=Permissions.VIEW, obj=project):
+
+def get_project(
+    user: User, project_id: int, fields: Optional[set[str]] = None
+) -> Project:
+    project: Project = get_object_or_404(
+        select_project_fields(Project.objects.all(), fields), id=project_id
+    )
+
+    if not get_permission_checker(user).has_perm(Permissions.VIEW, project):
         raise ProjectPermissionDenied
 
     return project
 
 
-def get_task(user: User, task_id: int) -> Task:
+def get_task(user: User, task_id: int, fields: Optional[set[str]] = None) -> Task:
+    # The project is needed for the permission check whatever the fields.
     task: Task = get_object_or_404(
-        Task.objects.prefetch_related("attachments"), id=task_id
+        select_task_fields(
+            Task.objects.select_related("project"),
+            fields if fields is None else {*fields, "project"},
+        ),
+        id=task_id,
     )
 
+    permissions = get_permission_checker(user)
+    permissions.prefetch(task, task.project)
+
     if not (
-        user.has_perm(Permissions.VIEW, task)
-        or user.has_perm(Permissions.VIEW, task.project)
+        permissions.has_perm(Permissions.VIEW, task)
+        or permissions.has_perm(Permissions.VIEW, task.project)
     ):
         raise ProjectPermissionDenied
 
     return task
 
 
-def get_tasks(user: User) -> list[Task]:
-    return get_objects_for_user(
-        user=user,
-        perms=Permissions.VIEW,
-        klass=Task.objects.prefetch_related("attachments"),
+def get_tasks(user: User, fields: Optional[set[str]] = None) -> QuerySet[Task]:
+    tasks = select_task_fields(Task.objects.all(), fields)
+
+    if user.is_superuser:
+        return tasks
+
+    return tasks.filter(
+        id__in=Visibility.objects.filter(user=user, task__isnull=False).values(
+            "task_id"
+        )
+    )
+
+
+def search_tasks(tasks: QuerySet[Task], q: str) -> QuerySet[Task]:
+    if connection.vendor != "postgresql":
+        return tasks.filter(
+            Q(title__icontains=q) | Q(description__icontains=q)
+        ).annotate(rank=Value(0.0, output_field=FloatField()))
+
+    query = SearchQuery(q, config="english", search_type="websearch")
+    return tasks.filter(search_vector=query).annotate(
+        rank=SearchRank(F("search_vector"), query)
     )
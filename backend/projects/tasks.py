@@ -1,65 +1,272 @@
-from celery import shared_task
+from collections import defaultdict
+from typing import Callable
+
+from celery import chord, shared_task
 from celery.utils.log import get_task_logger
-from django.core.mail import send_mail
 from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
 from django.db.models.query import QuerySet
+from django.utils.timezone import now
 
-from .models import Task
+from users.models import User
+from outbox.models import OutboxEmail
+from outbox.commands import enqueue_emails
+from .models import Task, TaskDigestEntry
 
 logger = get_task_logger(__name__)
 
 
-@shared_task
-def send_email_for_overdue_tasks():
-    logger.info("Checking for overdue tasks...")
+def get_recipients(task: Task) -> list[User]:
+    return (
+        [task.created_by, task.assignee]
+        if task.assignee and task.assignee.id != task.created_by.id
+        else [task.created_by]
+    )
+
+
+def get_recipient_list(task: Task) -> list[str]:
+    return [user.email for user in get_recipients(task)]
+
+
+def wants_digest(user: User) -> bool:
+    if user.notification_digest is None:
+        return settings.NOTIFICATION_DIGEST
+    return user.notification_digest
+
+
+def overdue_subject(task: Task) -> str:
+    return f"Your task '{task.title}' has exceeded the deadline."
+
+
+def pending_subject(task: Task) -> str:
+    return f"The deadline for your task '{task.title}' is at {task.due_date}."
+
+
+def overdue_digest_subject(count: int) -> str:
+    return f"{count} of your tasks have exceeded the deadline."
 
-    overdue_tasks: QuerySet[Task] = Task.read_model.get_overdue().filter(
-        overdue_notification_sent=False
+
+def pending_digest_subject(count: int) -> str:
+    return f"The deadlines for {count} of your tasks are approaching."
+
+
+def notification_body() -> str:
+    # TODO: add project url when frontend is ready
+    project_url = "[PROJECT_URL]"
+    return f"Follow this link to see the tasks: {project_url}"
+
+
+def iterate_chunks(tasks: QuerySet[Task], size: int):
+    # Keyset chunks on id: every chunk is a short indexed query.
+    last_id = 0
+    while chunk := list(tasks.filter(id__gt=last_id).order_by("id")[:size]):
+        yield chunk
+        last_id = chunk[-1].id
+
+
+def queue_task_notifications(
+    tasks: QuerySet[Task],
+    kind: str,
+    subject: Callable[[Task], str],
+    sent_flag: str,
+    next_notification_at=None,
+) -> int:
+    body = notification_body()
+
+    tasks = tasks.select_related("created_by", "assignee").only(
+        "id",
+        "title",
+        "due_date",
+        "created_by__email",
+        "created_by__notification_digest",
+        "assignee__email",
+        "assignee__notification_digest",
     )
 
-    for task in overdue_tasks:
-        # TODO: add project url when frontend is ready
-        project_url = "[PROJECT_URL]"
+    # The emails and digest entries are queued in the caller's transaction
+    # together with the sent flags, the outbox drainer delivers them once it
+    # commits.
+    queued = 0
+    for chunk in iterate_chunks(tasks, settings.NOTIFICATION_BATCH_SIZE):
+        emails, entries = [], []
+        for task in chunk:
+            for user in get_recipients(task):
+                if wants_digest(user):
+                    entries.append(
+                        TaskDigestEntry(recipient=user.email, kind=kind, task=task)
+                    )
+                    continue
+                emails.append(
+                    OutboxEmail(
+                        recipient=user.email,
+                        kind=f"task_{kind}",
+                        object_id=task.id,
+                        subject=subject(task),
+                        body=body,
+                        from_email=settings.DEFAULT_FROM_EMAIL,
+                    )
+                )
 
-        recipient_list = (
-            [task.created_by.email, task.assignee.email]
-            if task.assignee and task.assignee.id != task.created_by.id
-            else [task.created_by.email]
+        enqueue_emails(emails)
+        TaskDigestEntry.objects.bulk_create(entries)
+        Task.objects.filter(id__in=[task.id for task in chunk]).update(
+            **{sent_flag: True}, next_notification_at=next_notification_at
         )
+        queued += len(chunk)
 
-        send_mail(
-            subject=f"Your task '{task.title}' has exceeded the deadline.",
-            message=f"Follow this link to see the tasks: {project_url}",
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=recipient_list,
-        )
-        task.overdue_notification_sent = True
-        task.save()
+    return queued
+
+
+# Candidates, subjects of a single and a digest email, sent flag and the next
+# notification time once sent: the overdue reminder follows the pending one,
+# nothing follows the overdue.
+NOTIFICATIONS = {
+    "overdue": (
+        Task.read_model.get_overdue_to_notify,
+        overdue_subject,
+        overdue_digest_subject,
+        "overdue_notification_sent",
+        None,
+    ),
+    "pending": (
+        Task.read_model.get_pending_to_notify,
+        pending_subject,
+        pending_digest_subject,
+        "pending_notification_sent",
+        F("due_date"),
+    ),
+}
+
+
+def dispatch_notification_chunks(kind: str, scheduled_at=None) -> int:
+    candidates = NOTIFICATIONS[kind][0]()
+    if scheduled_at:
+        candidates = candidates & Task.read_model.get_notification_due(at=scheduled_at)
+    ids = list(candidates.order_by("id").values_list("id", flat=True))
+
+    size = settings.NOTIFICATION_CHUNK_SIZE
+    chunks = [
+        (ids[i], ids[min(i + size, len(ids)) - 1]) for i in range(0, len(ids), size)
+    ]
+    # Digests are sent once every chunk of the sweep is done, so a recipient
+    # gets one for the whole sweep. Entries left by a sweep whose last step
+    # failed go out with the next one.
+    if chunks:
+        chord(
+            [
+                send_notification_chunk.s(kind, first_id, last_id)
+                for first_id, last_id in chunks
+            ],
+            send_notification_digests.si(kind),
+        ).apply_async()
+    elif TaskDigestEntry.objects.filter(kind=kind).exists():
+        send_notification_digests.delay(kind)
+
+    return len(chunks)
 
 
 @shared_task
-def send_email_for_pending_tasks():
-    logger.info("Checking for pending tasks...")
+def send_notification_chunk(kind: str, first_id: int, last_id: int):
+    get_candidates, subject, _, sent_flag, next_notification_at = NOTIFICATIONS[kind]
+
+    # Rows locked by a concurrent chunk are skipped instead of waited on, and
+    # the predicate is re-checked under the lock, so a task is never sent twice.
+    with transaction.atomic():
+        tasks = (
+            get_candidates()
+            .filter(id__gte=first_id, id__lte=last_id)
+            .select_for_update(skip_locked=True, of=("self",))
+        )
+        queued = queue_task_notifications(
+            tasks,
+            kind=kind,
+            subject=subject,
+            sent_flag=sent_flag,
+            next_notification_at=next_notification_at,
+        )
 
-    pending_tasks: QuerySet[Task] = Task.read_model.get_pending().filter(
-        pending_notification_sent=False
+    logger.info(
+        f"Queued {queued} {kind} task notifications for ids {first_id}-{last_id}."
     )
 
-    for task in pending_tasks:
-        # TODO: add project url when frontend is ready
-        project_url = "[PROJECT_URL]"
 
-        recipient_list = (
-            [task.created_by.email, task.assignee.email]
-            if task.assignee and task.assignee.id != task.created_by.id
-            else [task.created_by.email]
+@shared_task
+def send_notification_digests(kind: str):
+    digest_subject = NOTIFICATIONS[kind][2]
+    body = notification_body()
+
+    # Entries locked by a concurrent run are left to it.
+    with transaction.atomic():
+        entries = list(
+            TaskDigestEntry.objects.filter(kind=kind)
+            .select_related("task")
+            .only("id", "recipient", "task__title", "task__due_date")
+            .select_for_update(skip_locked=True, of=("self",))
+            .order_by("recipient", "task_id")
         )
 
-        send_mail(
-            subject=f"The deadline for your task '{task.title}' is at {task.due_date}.",
-            message=f"Follow this link to see the tasks: {project_url}",
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=recipient_list,
+        digests: dict[str, list[TaskDigestEntry]] = defaultdict(list)
+        for entry in entries:
+            digests[entry.recipient].append(entry)
+
+        # Entry ids are never reused, so the first one keys the digest apart
+        # from any earlier one still pending a retry.
+        enqueue_emails(
+            OutboxEmail(
+                recipient=recipient,
+                kind=f"task_{kind}_digest",
+                object_id=min(entry.id for entry in recipient_entries),
+                subject=digest_subject(len(recipient_entries)),
+                body="\n".join(
+                    [
+                        f"{body}\n",
+                        *(
+                            f"- {entry.task.title}, due at {entry.task.due_date}"
+                            for entry in recipient_entries
+                        ),
+                    ]
+                ),
+                from_email=settings.DEFAULT_FROM_EMAIL,
+            )
+            for recipient, recipient_entries in digests.items()
         )
-        task.pending_notification_sent = True
-        task.save()
+        TaskDigestEntry.objects.filter(id__in=[entry.id for entry in entries]).delete()
+
+    logger.info(f"Queued {len(digests)} {kind} task notification digests.")
+
+
+@shared_task
+def send_due_task_notifications():
+    at = now()
+
+    # Tasks closed or already notified outside of projects.commands have
+    # nothing left to send.
+    Task.read_model.get_notification_due(at=at).filter(
+        Q(status=Task.StatusChoice.DONE)
+        | Q(pending_notification_sent=True, overdue_notification_sent=True)
+    ).update(next_notification_at=None)
+
+    chunks = sum(
+        dispatch_notification_chunks(kind, scheduled_at=at) for kind in NOTIFICATIONS
+    )
+
+    logger.info(f"Dispatched {chunks} scheduled notification chunks.")
+
+
+@shared_task
+def send_email_for_overdue_tasks():
+    logger.info("Checking for overdue tasks...")
+
+    chunks = dispatch_notification_chunks("overdue")
+
+    logger.info(f"Dispatched {chunks} overdue notification chunks.")
+
+
+@shared_task
+def send_email_for_pending_tasks():
+    logger.info("Checking for pending tasks...")
+
+    chunks = dispatch_notification_chunks("pending")
+
+    logger.info(f"Dispatched {chunks} pending notification chunks.")
@@ -1,3 +1,1022 @@
-from django.test import TestCase
+import json
+from datetime import timedelta
+from unittest.mock import patch
 
-# Create your tests here.
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.timezone import now
+from ninja.renderers import JSONRenderer
+
+from app.renderers import ORJSONRenderer
+from app.versions import get_versions, version_key
+from outbox.models import OutboxEmail
+from users.models import User
+from users.auth_token import AuthToken
+from users.cache import get_cached_user
+from permissions.permissions import (
+    assign_standard_permissions,
+    assign_task_assignee_permissions,
+)
+from .models import Project, Task, TaskDigestEntry
+from . import commands, queries
+from .api import TaskPage, render_task
+from .pagination import encode_cursor
+from .tasks import (
+    send_due_task_notifications,
+    send_email_for_overdue_tasks,
+    send_notification_chunk,
+)
+
+
+def create_user(email: str, password: str = "pass", is_active: bool = True):
+    return User.objects.create(email=email, password=password, is_active=is_active)
+
+
+def create_task(user: User, project: Project, title: str, **kwargs) -> Task:
+    kwargs.setdefault("due_date", now() + timedelta(days=1))
+    task = Task.objects.create(
+        created_by=user, project=project, title=title, description="", **kwargs
+    )
+    assign_standard_permissions(user=user, obj=task)
+    return task
+
+
+class GetTasksPaginationTests(TestCase):
+    def setUp(self):
+        # Versions and fragments outlive the rows rolled back between tests.
+        cache.clear()
+        self.user = create_user(email="owner@test.com")
+        self.project = commands.create_project(
+            user=self.user, name="Project", member_ids=set()
+        )
+        self.tasks = [
+            create_task(
+                self.user,
+                self.project,
+                title=f"Task {i}",
+                # Duplicate due dates force the id tie-breaker to be used.
+                due_date=now() + timedelta(days=1 + i // 2),
+            )
+            for i in range(7)
+        ]
+        self.HEADERS = {
+            "HTTP_AUTHORIZATION": f"Bearer {AuthToken.create_tokens(self.user.id)['access_token']}"
+        }
+
+    def get(self, **params):
+        response = self.client.get(
+            path=reverse("api-1:get_tasks"), data=params, **self.HEADERS
+        )
+        return response, json.loads(response.text)
+
+    def test_pages_through_all_tasks_in_order(self):
+        """
+        Following next_cursor returns every task exactly once, ordered by (due_date, id).
+        """
+        ids = []
+        params = {"limit": 3}
+
+        while True:
+            response, content = self.get(**params)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(content["items"]), 3)
+            ids += [item["id"] for item in content["items"]]
+
+            if content["next_cursor"] is None:
+                break
+            params["cursor"] = content["next_cursor"]
+
+        expected = [
+            task.id for task in sorted(self.tasks, key=lambda t: (t.due_date, t.id))
+        ]
+        self.assertEqual(ids, expected)
+
+    def test_descending_sort(self):
+        """
+        A "-" prefixed sort key pages backwards on both the key and the id.
+        """
+        _, first_page = self.get(limit=4, sort="-created_at")
+        _, second_page = self.get(
+            limit=4, sort="-created_at", cursor=first_page["next_cursor"]
+        )
+
+        ids = [item["id"] for item in first_page["items"] + second_page["items"]]
+        self.assertEqual(ids, sorted((task.id for task in self.tasks), reverse=True))
+        self.assertIsNone(second_page["next_cursor"])
+
+    def test_invalid_cursor(self):
+        """
+        Returns 422 when the cursor cannot be decoded.
+        """
+        response, content = self.get(cursor="not-a-cursor")
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(content["detail"], "['Invalid cursor.']")
+
+    def test_cursor_with_wrong_types(self):
+        """
+        Returns 422 when the cursor holds values of the wrong type or nulls.
+        """
+        for cursor in (encode_cursor([1, 1]), encode_cursor([None, 1])):
+            response, content = self.get(sort="due_date", cursor=cursor)
+
+            self.assertEqual(response.status_code, 422)
+            self.assertEqual(content["detail"], "['Invalid cursor.']")
+
+    def test_stream_returns_every_task_as_ndjson(self):
+        """
+        stream=1 sends one task per line from the cursor on, ignoring limit.
+        """
+        _, first_page = self.get(limit=2)
+
+        with patch("projects.api.STREAM_CHUNK_SIZE", 2):
+            response = self.client.get(
+                path=reverse("api-1:get_tasks"),
+                data={"stream": 1, "limit": 2, "cursor": first_page["next_cursor"]},
+                **self.HEADERS,
+            )
+            lines = b"".join(response.streaming_content).splitlines()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        expected = [
+            task.id for task in sorted(self.tasks, key=lambda t: (t.due_date, t.id))
+        ]
+        self.assertEqual([json.loads(line)["id"] for line in lines], expected[2:])
+
+
+class ListQueryCountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_user(email="owner@test.com")
+        self.assignee = create_user(email="assignee@test.com")
+        self.HEADERS = {
+            "HTTP_AUTHORIZATION": f"Bearer {AuthToken.create_tokens(self.user.id)['access_token']}"
+        }
+        # Keeps the first request's user lookup out of the query counts.
+        get_cached_user(uid=self.user.id)
+
+    def count_queries(self, url_name: str) -> int:
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(path=reverse(url_name), **self.HEADERS)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def add_projects_with_tasks(self, count: int):
+        for i in range(count):
+            project = commands.create_project(
+                user=self.user, name=f"Project {i}", member_ids={self.assignee.id}
+            )
+            create_task(self.user, project, title=f"Task {i}", assignee=self.assignee)
+
+    def test_get_tasks_query_count_does_not_depend_on_page_size(self):
+        """
+        Assignee, creator and attachments are loaded in a fixed number of queries.
+        """
+        self.add_projects_with_tasks(2)
+        small_page = self.count_queries("api-1:get_tasks")
+
+        self.add_projects_with_tasks(8)
+        large_page = self.count_queries("api-1:get_tasks")
+
+        self.assertEqual(small_page, large_page)
+
+    def test_get_projects_query_count_does_not_depend_on_page_size(self):
+        """
+        Project members are loaded in a fixed number of queries.
+        """
+        self.add_projects_with_tasks(2)
+        small_page = self.count_queries("api-1:get_projects")
+
+        self.add_projects_with_tasks(8)
+        large_page = self.count_queries("api-1:get_projects")
+
+        self.assertEqual(small_page, large_page)
+
+
+class PermissionQueryCountTests(TestCase):
+    def setUp(self):
+        self.owner = create_user(email="owner@test.com")
+        self.member = create_user(email="member@test.com")
+        self.project = commands.create_project(
+            user=self.owner, name="Project", member_ids={self.member.id}
+        )
+        self.task = create_task(self.owner, self.project, title="Task")
+
+    def count_permission_queries(self, func, **kwargs) -> int:
+        with CaptureQueriesContext(connection) as context:
+            func(**kwargs)
+        return sum(
+            query["sql"].startswith("SELECT")
+            and "guardian_userobjectpermission" in query["sql"]
+            for query in context.captured_queries
+        )
+
+    def test_delete_task_runs_single_permission_query(self):
+        """
+        Task and project permissions are fetched together and reused across checks.
+        """
+        member = User.objects.get(id=self.member.id)
+
+        self.assertEqual(
+            self.count_permission_queries(
+                commands.delete_task, user=member, task_id=self.task.id
+            ),
+            1,
+        )
+        self.assertFalse(Task.objects.filter(id=self.task.id).exists())
+
+    def test_delete_project_runs_single_permission_query(self):
+        """
+        The VIEW check in get_project prefetches the DELETE permission.
+        """
+        owner = User.objects.get(id=self.owner.id)
+
+        self.assertEqual(
+            self.count_permission_queries(
+                commands.delete_project, user=owner, project_id=self.project.id
+            ),
+            1,
+        )
+        self.assertFalse(Project.objects.filter(id=self.project.id).exists())
+
+
+class BulkCreateTasksTests(TestCase):
+    def setUp(self):
+        self.user = create_user(email="owner@test.com")
+        self.assignee = create_user(email="assignee@test.com")
+        self.project = commands.create_project(
+            user=self.user, name="Project", member_ids={self.assignee.id}
+        )
+        self.URL = reverse("api-1:bulk_create_tasks", args=[self.project.id])
+        self.HEADERS = {
+            "HTTP_AUTHORIZATION": f"Bearer {AuthToken.create_tokens(self.user.id)['access_token']}"
+        }
+        # Keeps the first request's user lookup out of the query counts.
+        get_cached_user(uid=self.user.id)
+
+    def task_input(self, title: str, **kwargs):
+        return {
+            "title": title,
+            "description": "",
+            "status": Task.StatusChoice.TO_DO,
+            "assignee_id": None,
+            "due_date": (now() + timedelta(days=1)).isoformat(),
+            **kwargs,
+        }
+
+    def post(self, tasks):
+        return self.client.post(
+            path=self.URL,
+            data={"tasks": tasks},
+            content_type="application/json",
+            **self.HEADERS,
+        )
+
+    def test_creates_valid_tasks_and_reports_invalid_ones(self):
+        """
+        Returns one result per input item, in order, with errors for invalid items.
+        """
+        response = self.post(
+            [
+                self.task_input("Assigned", assignee_id=self.assignee.id),
+                self.task_input("Unknown assignee", assignee_id=999999),
+                self.task_input("No due date", due_date=None),
+                self.task_input("Unassigned"),
+            ]
+        )
+
+        content = json.loads(response.text)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(content[0]["task"]["assignee"]["id"], self.assignee.id)
+        self.assertIn("assignee_id", content[1]["errors"])
+        self.assertIn("due_date", content[2]["errors"])
+        self.assertEqual(content[3]["task"]["title"], "Unassigned")
+
+        self.assertEqual(
+            set(Task.objects.values_list("title", flat=True)),
+            {"Assigned", "Unassigned"},
+        )
+        self.assertQuerySetEqual(
+            queries.get_tasks(user=self.assignee),
+            Task.objects.filter(title="Assigned"),
+        )
+
+    def test_query_count_does_not_depend_on_batch_size(self):
+        """
+        Tasks, permissions and visibility are inserted with a fixed number of queries.
+        """
+
+        def count_queries(size: int) -> int:
+            tasks = [
+                self.task_input(f"Task {i}", assignee_id=self.assignee.id)
+                for i in range(size)
+            ]
+            with CaptureQueriesContext(connection) as context:
+                self.assertEqual(self.post(tasks).status_code, 201)
+            return len(context.captured_queries)
+
+        self.assertEqual(count_queries(2), count_queries(20))
+
+
+class BulkUpdateTasksTests(TestCase):
+    def setUp(self):
+        self.user = create_user(email="owner@test.com")
+        self.assignee = create_user(email="assignee@test.com")
+        self.other = create_user(email="other@test.com")
+        self.project = commands.create_project(
+            user=self.user, name="Project", member_ids={self.assignee.id}
+        )
+        self.other_project = commands.create_project(
+            user=self.other, name="Other", member_ids=set()
+        )
+        self.URL = reverse("api-1:bulk_update_tasks")
+        self.HEADERS = {
+            "HTTP_AUTHORIZATION": f"Bearer {AuthToken.create_tokens(self.user.id)['access_token']}"
+        }
+
+    def patch(self, **data):
+        response = self.client.patch(
+            path=self.URL, data=data, content_type="application/json", **self.HEADERS
+        )
+        return response, json.loads(response.text)
+
+    def test_updates_permitted_tasks_and_reports_failures(self):
+        """
+        Returns a result per task id and only updates tasks the user may change.
+        """
+        overdue = create_task(
+            self.user, self.project, title="Overdue", due_date=now() - timedelta(days=1)
+        )
+        foreign = create_task(self.other, self.other_project, title="Foreign")
+
+        response, content = self.patch(
+            task_ids=[overdue.id, foreign.id, 999999], status=Task.StatusChoice.DONE
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(content[str(overdue.id)]["task"]["status"], 4)
+        self.assertEqual(
+            content[str(foreign.id)]["errors"], content["999999"]["errors"]
+        )
+
+        overdue.refresh_from_db()
+        foreign.refresh_from_db()
+        self.assertEqual(overdue.status, Task.StatusChoice.DONE)
+        self.assertEqual(foreign.status, Task.StatusChoice.TO_DO)
+
+    def test_empty_changes_are_rejected(self):
+        """
+        A request without changes fails instead of reporting every task as updated.
+        """
+        task = create_task(self.user, self.project, title="Task")
+        cache.set(version_key("task", task.id), 1)
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            response, _ = self.patch(task_ids=[task.id])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(callbacks, [])
+        self.assertEqual(cache.get(version_key("task", task.id)), 1)
+
+    def test_reassignment_moves_assignee_permissions(self):
+        """
+        The previous assignee loses access and the new one gains it.
+        """
+        tasks = [
+            create_task(self.user, self.project, title=f"Task {i}", assignee=self.other)
+            for i in range(3)
+        ]
+        for task in tasks:
+            assign_task_assignee_permissions(self.other, task)
+
+        response, _ = self.patch(
+            task_ids=[task.id for task in tasks], assignee_id=self.assignee.id
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertQuerySetEqual(
+            queries.get_tasks(user=self.assignee), tasks, ordered=False
+        )
+        self.assertQuerySetEqual(queries.get_tasks(user=self.other), [])
+
+
+class SearchTasksTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_user(email="owner@test.com")
+        self.project = commands.create_project(
+            user=self.user, name="Project", member_ids=set()
+        )
+        self.HEADERS = {
+            "HTTP_AUTHORIZATION": f"Bearer {AuthToken.create_tokens(self.user.id)['access_token']}"
+        }
+
+    def get(self, **params):
+        response = self.client.get(
+            path=reverse("api-1:get_tasks"), data=params, **self.HEADERS
+        )
+        return response, json.loads(response.text)
+
+    def test_q_matches_title_and_description(self):
+        """
+        Returns tasks matching the query in the title or the description.
+        """
+        by_title = create_task(self.user, self.project, title="Fix invoice export")
+        by_description = create_task(self.user, self.project, title="Billing")
+        by_description.description = "The invoice total is wrong"
+        by_description.save()
+        create_task(self.user, self.project, title="Unrelated")
+
+        response, content = self.get(q="invoice", sort="-rank", limit=1)
+        _, next_page = self.get(
+            q="invoice", sort="-rank", limit=1, cursor=content["next_cursor"]
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {item["id"] for item in content["items"] + next_page["items"]},
+            {by_title.id, by_description.id},
+        )
+        self.assertIsNone(next_page["next_cursor"])
+
+    def test_rank_sort_requires_q(self):
+        """
+        Returns 422 when sorting by rank without a search query.
+        """
+        response, _ = self.get(sort="-rank")
+
+        self.assertEqual(response.status_code, 422)
+
+    def test_search_vector_is_never_read_or_written(self):
+        """
+        Task reads leave the search vector out, so saves do not write it back.
+        """
+        task = create_task(self.user, self.project, title="Task")
+
+        with CaptureQueriesContext(connection) as context:
+            self.get()
+            self.get(fields="id,title")
+            task = Task.objects.get(id=task.id)
+            task.status = Task.StatusChoice.DONE
+            task.save()
+
+        for query in context.captured_queries:
+            self.assertNotIn("search_vector", query["sql"])
+
+
+class ProjectFilterTests(TestCase):
+    def test_member_email_filter_returns_each_project_once(self):
+        """
+        A project with several matching members is listed a single time.
+        """
+        user = create_user(email="owner@test.com")
+        members = {create_user(email=f"dev{i}@example.com").id for i in range(3)}
+        project = commands.create_project(user=user, name="Project", member_ids=members)
+        commands.create_project(user=user, name="Solo", member_ids=set())
+
+        response = self.client.get(
+            path=reverse("api-1:get_projects"),
+            data={"member_email": "example.com"},
+            HTTP_AUTHORIZATION=f"Bearer {AuthToken.create_tokens(user.id)['access_token']}",
+        )
+
+        content = json.loads(response.text)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item["id"] for item in content["items"]], [project.id])
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_user(email="owner@test.com")
+        self.member = create_user(email="member@test.com")
+        self.project = commands.create_project(
+            user=self.user, name="Project", member_ids=set()
+        )
+        self.task = create_task(self.user, self.project, title="Task")
+        self.HEADERS = {
+            "HTTP_AUTHORIZATION": f"Bearer {AuthToken.create_tokens(self.user.id)['access_token']}"
+        }
+
+    def test_matching_etag_returns_not_modified(self):
+        """
+        A client sending back the ETag it received gets a bodiless 304.
+        """
+        path = reverse("api-1:get_task", args=[self.task.id])
+        response = self.client.get(path=path, **self.HEADERS)
+        etag = response["ETag"]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                path=path, HTTP_IF_NONE_MATCH=etag, **self.HEADERS
+            )
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(len(queries), 0)
+
+    def test_update_changes_etag(self):
+        """
+        Once a change commits, the old ETags of the task and the task list
+        no longer match.
+        """
+        paths = [
+            reverse("api-1:get_task", args=[self.task.id]),
+            reverse("api-1:get_tasks"),
+        ]
+        etags = [self.client.get(path=path, **self.HEADERS)["ETag"] for path in paths]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            commands.update_task(
+                user=self.user,
+                task_id=self.task.id,
+                title="Renamed",
+                description="",
+                status=Task.StatusChoice.TO_DO,
+                due_date=self.task.due_date,
+            )
+
+        for path, etag in zip(paths, etags):
+            response = self.client.get(
+                path=path, HTTP_IF_NONE_MATCH=etag, **self.HEADERS
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response["ETag"], etag)
+
+    @patch("app.versions.cache")
+    def test_missing_version_is_added_with_a_ttl(self, mock_cache):
+        """
+        A version started for an unknown key expires, and one bumped meanwhile is kept.
+        """
+        key = version_key("task", 0)
+        mock_cache.add.return_value = False
+        mock_cache.get.return_value = 42
+
+        self.assertEqual(get_versions(key, cached={}), {key: 42})
+        self.assertEqual(
+            mock_cache.add.call_args.kwargs["timeout"], settings.VERSION_TTL
+        )
+        mock_cache.set_many.assert_not_called()
+
+    def test_membership_change_changes_project_list_etag(self):
+        """
+        The ETag covers what the user may see, so a new membership invalidates
+        the member's project list.
+        """
+        headers = {
+            "HTTP_AUTHORIZATION": f"Bearer {AuthToken.create_tokens(self.member.id)['access_token']}"
+        }
+        path = reverse("api-1:get_projects")
+        etag = self.client.get(path=path, **headers)["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            commands.update_project(
+                user=self.user,
+                project_id=self.project.id,
+                name="Project",
+                member_ids={self.member.id},
+            )
+
+        response = self.client.get(path=path, HTTP_IF_NONE_MATCH=etag, **headers)
+        content = json.loads(response.text)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item["id"] for item in content["items"]], [self.project.id])
+
+
+class TaskFragmentTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_user(email="owner@test.com")
+        self.project = commands.create_project(
+            user=self.user, name="Project", member_ids=set()
+        )
+        self.tasks = [
+            create_task(self.user, self.project, title=f"Task {i}") for i in range(3)
+        ]
+        self.HEADERS = {
+            "HTTP_AUTHORIZATION": f"Bearer {AuthToken.create_tokens(self.user.id)['access_token']}"
+        }
+
+    def test_unchanged_tasks_are_not_rendered_again(self):
+        """
+        A repeated list request is assembled from cached fragments only and
+        matches the first response byte for byte.
+        """
+        path = reverse("api-1:get_tasks")
+        first = self.client.get(path=path, **self.HEADERS)
+
+        with patch("projects.api.render_task", wraps=render_task) as mock_render:
+            second = self.client.get(path=path, **self.HEADERS)
+
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(len(json.loads(second.text)["items"]), 3)
+        mock_render.assert_not_called()
+
+    def test_changed_task_is_rendered_again(self):
+        """
+        Updating a task bumps its version, so only its fragment is rebuilt.
+        """
+        path = reverse("api-1:get_tasks")
+        self.client.get(path=path, **self.HEADERS)
+
+        task = self.tasks[1]
+        with self.captureOnCommitCallbacks(execute=True):
+            commands.update_task(
+                user=self.user,
+                task_id=task.id,
+                title="Renamed",
+                description="",
+                status=Task.StatusChoice.TO_DO,
+                due_date=task.due_date,
+            )
+
+        with patch("projects.api.render_task", wraps=render_task) as mock_render:
+            response = self.client.get(path=path, **self.HEADERS)
+
+        titles = [item["title"] for item in json.loads(response.text)["items"]]
+        self.assertIn("Renamed", titles)
+        self.assertEqual(mock_render.call_count, 1)
+
+    def test_missing_task_versions_expire(self):
+        """
+        Versions started for tasks not in the cache yet are added with a TTL.
+        """
+        with patch.object(cache, "add", wraps=cache.add) as mock_add:
+            self.client.get(path=reverse("api-1:get_tasks"), **self.HEADERS)
+
+        calls = {
+            call.args[0]: call.kwargs["timeout"] for call in mock_add.call_args_list
+        }
+        for task in self.tasks:
+            self.assertEqual(calls[version_key("task", task.id)], settings.VERSION_TTL)
+
+
+class SparseFieldsetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_user(email="owner@test.com")
+        self.member = create_user(email="member@test.com")
+        self.project = commands.create_project(
+            user=self.user, name="Project", member_ids={self.member.id}
+        )
+        self.task = create_task(
+            self.user, self.project, title="Task", assignee=self.member
+        )
+        self.HEADERS = {
+            "HTTP_AUTHORIZATION": f"Bearer {AuthToken.create_tokens(self.user.id)['access_token']}"
+        }
+        get_cached_user(uid=self.user.id)
+
+    def get(self, path: str, **params):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(path=path, data=params, **self.HEADERS)
+        self.assertEqual(response.status_code, 200)
+        sql = " ".join(query["sql"] for query in context.captured_queries)
+        return json.loads(response.text), sql
+
+    def test_task_fields_narrow_response_and_sql(self):
+        """
+        Only the requested task fields are sent, and the description, users
+        and attachments are neither selected nor prefetched.
+        """
+        fields = "id,title,status,due_date"
+        for path in (
+            reverse("api-1:get_tasks"),
+            reverse("api-1:get_task", args=[self.task.id]),
+        ):
+            content, sql = self.get(path, fields=fields)
+
+            task = content["items"][0] if "items" in content else content
+            self.assertEqual(list(task), ["id", "title", "status", "due_date"])
+            self.assertNotIn("description", sql)
+            self.assertNotIn("users_user", sql)
+            self.assertNotIn("taskattachment", sql)
+
+    def test_project_fields_skip_members(self):
+        """
+        Members are only prefetched when they are requested.
+        """
+        content, sql = self.get(reverse("api-1:get_projects"), fields="id,name")
+        self.assertEqual(content["items"], [{"id": self.project.id, "name": "Project"}])
+        self.assertNotIn("users_user", sql)
+
+        content, _ = self.get(
+            reverse("api-1:get_project", args=[self.project.id]),
+            fields="members",
+        )
+        self.assertEqual(
+            content, {"members": [{"id": self.member.id, "email": "member@test.com"}]}
+        )
+
+    def test_unknown_field(self):
+        """
+        Returns 422 for a field the schema does not have.
+        """
+        response = self.client.get(
+            path=reverse("api-1:get_tasks"),
+            data={"fields": "id,secret"},
+            **self.HEADERS,
+        )
+
+        self.assertEqual(response.status_code, 422)
+
+
+class RendererTests(TestCase):
+    def test_orjson_renderer_matches_json_renderer(self):
+        """
+        Both renderers produce the same JSON document for task payloads,
+        including millisecond datetimes, enums and non-string keys.
+        """
+        user = create_user(email="żółw@test.com")
+        project = commands.create_project(user=user, name="Project", member_ids=set())
+        task = create_task(
+            user,
+            project,
+            title="Zadanie ąę",
+            assignee=user,
+            due_date=now() + timedelta(days=1, microseconds=123456),
+            status=Task.StatusChoice.REVIEW,
+        )
+        request = RequestFactory().get("/")
+        data = {
+            "page": TaskPage.model_validate(
+                {"items": [task], "next_cursor": "abc"}, context={"request": request}
+            ).model_dump(),
+            "bulk": {task.id: {"errors": {"title": ["Too long."]}}},
+        }
+
+        expected = JSONRenderer().render(request, data, response_status=200)
+        rendered = ORJSONRenderer().render(request, data, response_status=200)
+
+        self.assertEqual(json.loads(rendered), json.loads(expected))
+
+
+class NotificationSweepTests(TestCase):
+    def setUp(self):
+        self.owner = create_user(email="owner@test.com")
+        self.assignee = create_user(email="assignee@test.com")
+        self.project = commands.create_project(
+            user=self.owner, name="Project", member_ids=set()
+        )
+
+    def create_overdue_tasks(self, count: int):
+        return [
+            create_task(
+                self.owner,
+                self.project,
+                title=f"Task {i}",
+                assignee=self.assignee,
+                due_date=now() - timedelta(minutes=1),
+            )
+            for i in range(count)
+        ]
+
+    def test_overdue_sweep_sends_and_flags_every_task(self):
+        """
+        Sends one message per overdue task to creator and assignee and marks it as sent.
+        """
+        tasks = self.create_overdue_tasks(3)
+        create_task(self.owner, self.project, title="Not due")
+
+        with (
+            self.settings(NOTIFICATION_BATCH_SIZE=2),
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            send_email_for_overdue_tasks()
+
+        self.assertEqual(len(mail.outbox), 6)
+        self.assertEqual(
+            [message.to for message in mail.outbox[:2]],
+            [["owner@test.com"], ["assignee@test.com"]],
+        )
+        self.assertFalse(
+            Task.objects.filter(
+                id__in=[task.id for task in tasks], overdue_notification_sent=False
+            ).exists()
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            send_email_for_overdue_tasks()
+        self.assertEqual(len(mail.outbox), 6)
+
+    def test_overdue_sweep_query_count_depends_on_chunks_only(self):
+        """
+        Users are loaded with the tasks, so a chunk costs the same queries at any size.
+        """
+
+        def count_queries(size: int) -> int:
+            self.create_overdue_tasks(size)
+            with CaptureQueriesContext(connection) as context:
+                send_email_for_overdue_tasks()
+            return len(context.captured_queries)
+
+        self.assertEqual(count_queries(2), count_queries(20))
+
+    def test_overdue_sweep_dispatches_one_subtask_per_chunk(self):
+        """
+        Splits the candidate ids into chunks of NOTIFICATION_CHUNK_SIZE tasks.
+        """
+        tasks = self.create_overdue_tasks(5)
+
+        with (
+            self.settings(NOTIFICATION_CHUNK_SIZE=2),
+            patch("projects.tasks.chord") as chord,
+        ):
+            send_email_for_overdue_tasks()
+
+        self.assertEqual(
+            [signature.args for signature in chord.call_args.args[0]],
+            [
+                ("overdue", tasks[0].id, tasks[1].id),
+                ("overdue", tasks[2].id, tasks[3].id),
+                ("overdue", tasks[4].id, tasks[4].id),
+            ],
+        )
+
+    def test_notification_chunk_only_sends_its_own_range(self):
+        """
+        A chunk subtask sends the unsent candidates between its bounds and skips the rest.
+        """
+        tasks = self.create_overdue_tasks(4)
+        Task.objects.filter(id=tasks[1].id).update(overdue_notification_sent=True)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            send_notification_chunk("overdue", tasks[0].id, tasks[2].id)
+
+        self.assertEqual(len(mail.outbox), 4)
+        self.assertEqual(
+            list(
+                Task.objects.filter(overdue_notification_sent=False).values_list(
+                    "id", flat=True
+                )
+            ),
+            [tasks[3].id],
+        )
+
+
+class DigestNotificationTests(TestCase):
+    def setUp(self):
+        self.owner = create_user(email="owner@test.com")
+        self.assignee = create_user(email="assignee@test.com")
+        self.project = commands.create_project(
+            user=self.owner, name="Project", member_ids=set()
+        )
+        for i in range(3):
+            create_task(
+                self.owner,
+                self.project,
+                title=f"Task {i}",
+                assignee=self.assignee,
+                due_date=now() - timedelta(minutes=1),
+            )
+
+    def get_recipients(self) -> list[str]:
+        with self.captureOnCommitCallbacks(execute=True):
+            send_email_for_overdue_tasks()
+        return [message.to[0] for message in mail.outbox]
+
+    def test_digest_user_gets_one_email_listing_all_tasks(self):
+        """
+        A user with digest mode gets a single email for the sweep, others one per task.
+        """
+        User.objects.filter(id=self.assignee.id).update(notification_digest=True)
+
+        recipients = self.get_recipients()
+
+        self.assertEqual(recipients.count("owner@test.com"), 3)
+        self.assertEqual(recipients.count("assignee@test.com"), 1)
+        digest = mail.outbox[recipients.index("assignee@test.com")]
+        self.assertEqual(digest.subject, "3 of your tasks have exceeded the deadline.")
+        for i in range(3):
+            self.assertIn(f"- Task {i}, due at", digest.body)
+
+    def test_digest_spans_all_chunks_of_the_sweep(self):
+        """
+        A digest user whose tasks fall into several chunks still gets a single email.
+        """
+        User.objects.filter(id=self.assignee.id).update(notification_digest=True)
+
+        with self.settings(NOTIFICATION_CHUNK_SIZE=1):
+            recipients = self.get_recipients()
+
+        self.assertEqual(recipients.count("assignee@test.com"), 1)
+        digest = mail.outbox[recipients.index("assignee@test.com")]
+        self.assertEqual(digest.subject, "3 of your tasks have exceeded the deadline.")
+        self.assertFalse(TaskDigestEntry.objects.exists())
+
+    def test_new_digest_is_not_dropped_by_a_pending_one(self):
+        """
+        Each digest has its own key, so one still waiting in the outbox does not swallow the next.
+        """
+        User.objects.filter(id=self.assignee.id).update(notification_digest=True)
+        with patch("outbox.commands.drain_outbox"):
+            send_email_for_overdue_tasks()
+
+        create_task(
+            self.owner,
+            self.project,
+            title="Task 3",
+            assignee=self.assignee,
+            due_date=now() - timedelta(minutes=1),
+        )
+        with patch("outbox.commands.drain_outbox"):
+            send_email_for_overdue_tasks()
+
+        self.assertEqual(
+            OutboxEmail.objects.filter(
+                recipient="assignee@test.com", kind="task_overdue_digest"
+            ).count(),
+            2,
+        )
+
+    def test_user_choice_overrides_global_digest_setting(self):
+        """
+        NOTIFICATION_DIGEST applies to users who did not choose a mode themselves.
+        """
+        User.objects.filter(id=self.owner.id).update(notification_digest=False)
+
+        with self.settings(NOTIFICATION_DIGEST=True):
+            recipients = self.get_recipients()
+
+        self.assertEqual(recipients.count("owner@test.com"), 3)
+        self.assertEqual(recipients.count("assignee@test.com"), 1)
+
+
+class ScheduledNotificationTests(TestCase):
+    def setUp(self):
+        self.owner = create_user(email="owner@test.com")
+        self.project = commands.create_project(
+            user=self.owner, name="Project", member_ids=set()
+        )
+
+    def create_task(self, due_date):
+        return commands.create_task(
+            user=self.owner,
+            project_id=self.project.id,
+            title="Task",
+            description="",
+            status=Task.StatusChoice.TO_DO,
+            due_date=due_date,
+        )
+
+    def test_commands_schedule_the_next_reminder(self):
+        """
+        The pending reminder is scheduled before the due date and cleared when the task is done.
+        """
+        due_date = now() + timedelta(days=1)
+        task = self.create_task(due_date)
+        self.assertEqual(task.next_notification_at, due_date - timedelta(hours=1))
+
+        task = commands.update_task(
+            user=self.owner,
+            task_id=task.id,
+            title="Task",
+            description="",
+            status=Task.StatusChoice.DONE,
+            due_date=due_date,
+        )
+        task.refresh_from_db()
+        self.assertIsNone(task.next_notification_at)
+
+    def test_rescheduling_resets_sent_reminders(self):
+        """
+        Moving the due date of an already reminded task schedules a new pending reminder.
+        """
+        task = self.create_task(now() + timedelta(minutes=30))
+        send_due_task_notifications()
+
+        due_date = now() + timedelta(days=2)
+        commands.bulk_update_tasks(
+            user=self.owner, task_ids={task.id}, due_date=due_date
+        )
+
+        task.refresh_from_db()
+        self.assertFalse(task.pending_notification_sent)
+        self.assertEqual(task.next_notification_at, due_date - timedelta(hours=1))
+
+    def test_due_notifications_only_send_scheduled_tasks(self):
+        """
+        Sends the reminders that are due and moves them on to the overdue reminder.
+        """
+        task = self.create_task(now() + timedelta(minutes=30))
+        self.create_task(now() + timedelta(days=1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            send_due_task_notifications()
+
+        self.assertEqual(len(mail.outbox), 1)
+        task.refresh_from_db()
+        self.assertTrue(task.pending_notification_sent)
+        self.assertEqual(task.next_notification_at, task.due_date)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            send_due_task_notifications()
+        self.assertEqual(len(mail.outbox), 1)
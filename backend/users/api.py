@@ -1,15 +1,18 @@
+from typing import Optional
+
 from django.contrib.auth import authenticate
 from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
 from django.urls import reverse
 from django.conf import settings
+from django.db import transaction
 from django.http import HttpRequest, HttpResponse
 from ninja import Router, Schema
 from ninja.errors import HttpError
 
+from outbox.commands import enqueue_email
 from .auth_token import AuthToken
 from .queries import get_user_by_id
-from .commands import activate_user_account, create_user
+from .commands import activate_user_account, create_user, update_profile
 from .exceptions import InvalidActivationToken, InvalidToken
 
 router = Router()
@@ -29,7 +32,17 @@ class RefreshResponse(Schema):
     access_token: str
 
 
+class ProfileInput(Schema):
+    notification_digest: Optional[bool] = None
+
+
+class ProfileOutput(Schema):
+    email: str
+    notification_digest: Optional[bool]
+
+
 @router.post("/register", url_name="register", auth=None)
+@transaction.atomic
 def register(request: HttpRequest, payload: UserInput):
     try:
         user = create_user(email=payload.email, password=payload.password)
@@ -41,11 +54,13 @@ def register(request: HttpRequest, payload: UserInput):
         reverse("api-1:activate", args=[user.pk, token])
     )
 
-    send_mail(
+    enqueue_email(
+        recipient=user.email,
+        kind="activation",
+        object_id=user.pk,
         subject="Activate your account",
         message=f"Click the link to activate your account: {activation_link}",
         from_email=settings.DEFAULT_FROM_EMAIL,
-        recipient_list=[user.email],
     )
 
     return {"detail": "User registered successfully!"}
@@ -108,7 +123,7 @@ def refresh_token(request: HttpRequest, response: HttpResponse):
         samesite="lax",
     )
 
-    AuthToken.blacklist_token(refresh_token, settings.JWT_REFRESH_EXP_TIME)
+    AuthToken.blacklist_token(token=refresh_token)
 
     return {
         "access_token": new_tokens["access_token"],
@@ -120,16 +135,19 @@ def logout(request: HttpRequest):
     access_token = request.auth["access_token"]
     refresh_token = request.COOKIES["refresh_token"]
 
-    # TODO: compute ttl
-    AuthToken.blacklist_token(token=access_token, timeout=settings.JWT_EXP_TIME)
-    AuthToken.blacklist_token(
-        token=refresh_token, timeout=settings.JWT_REFRESH_EXP_TIME
-    )
+    AuthToken.blacklist_token(token=access_token)
+    AuthToken.blacklist_token(token=refresh_token)
 
     return {"detail": "You have successfully logged out."}
 
 
-@router.get("/profile")
+@router.get("/profile", response=ProfileOutput)
 def user_profile(request: HttpRequest):
-    user = request.auth["user"]
-    return {"email": user.email}
+    return request.auth["user"]
+
+
+@router.patch("/profile", url_name="update_profile", response=ProfileOutput)
+def update_user_profile(request: HttpRequest, payload: ProfileInput):
+    return update_profile(
+        user=request.auth["user"], notification_digest=payload.notification_digest
+    )
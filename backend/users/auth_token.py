@@ -1,15 +1,28 @@
 from datetime import datetime, timedelta
-from typing import TypedDict
+from hashlib import sha256
+from math import ceil
+from time import time
+from typing import Optional, TypedDict
 from django.conf import settings
 from django.core.cache import cache
 import jwt
 
+from .blacklist import blacklist_key, revocations
+from .lru import LRUCache
+
+# Claims of tokens that already passed verification, until they expire.
+_verified_tokens = LRUCache(maxsize=settings.JWT_CACHE_SIZE)
+
 
 class Tokens(TypedDict):
     access_token: str
     refresh_token: str
 
 
+def token_digest(token: str) -> str:
+    return sha256(token.encode()).hexdigest()
+
+
 class AuthToken:
     @staticmethod
     def encode_jwt(uid: int, exp: int) -> str:
@@ -24,9 +37,23 @@ class AuthToken:
 
     @staticmethod
     def decode_jwt(token: str) -> dict:
-        return jwt.decode(
-            token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM]
-        )
+        digest = token_digest(token)
+        payload = _verified_tokens.get(digest)
+        if payload is None:
+            payload = jwt.decode(
+                token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM]
+            )
+            _verified_tokens.set(digest, payload, expires_at=payload["exp"])
+
+        return dict(payload)
+
+    @staticmethod
+    def decode_cache_stats() -> dict:
+        return {
+            "hits": _verified_tokens.hits,
+            "misses": _verified_tokens.misses,
+            "size": len(_verified_tokens),
+        }
 
     @classmethod
     def create_tokens(cls, uid: int) -> Tokens:
@@ -37,10 +64,25 @@ class AuthToken:
             "refresh_token": refresh_token,
         }
 
-    @staticmethod
-    def blacklist_token(token: str, timeout: int):
-        cache.set(token, "blacklisted", timeout=timeout)
+    @classmethod
+    def blacklist_token(cls, token: str, timeout: Optional[int] = None):
+        digest = token_digest(token)
+
+        # By default the key lives exactly as long as the token is valid.
+        if timeout is None:
+            try:
+                timeout = ceil(cls.decode_jwt(token)["exp"] - time())
+            except jwt.ExpiredSignatureError:
+                return
+
+        cache.set(blacklist_key(digest), True, timeout=timeout)
+        _verified_tokens.delete(digest)
+        revocations.publish(digest)
 
     @staticmethod
     def is_token_blacklisted(token: str) -> bool:
-        return cache.get(token) == "blacklisted"
+        digest = token_digest(token)
+        if not revocations.might_contain(digest):
+            return False
+
+        return cache.get(blacklist_key(digest)) is not None
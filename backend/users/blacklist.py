@@ -0,0 +1,145 @@
+import logging
+import os
+import threading
+import time
+
+import redis
+from django.conf import settings
+from django.core.cache import cache
+from django_redis import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "auth:blacklist"
+RETRY_DELAY = 5
+
+
+def get_client() -> redis.Redis:
+    return get_redis_connection("default")
+
+
+def blacklist_key(digest: str) -> str:
+    return f"blacklist:{digest}"
+
+
+class BloomFilter:
+    """
+    Fixed size Bloom filter over hex token digests. The bit positions are
+    sliced from the digest itself, so no extra hashing is needed.
+    """
+
+    def __init__(self, bits: int, hashes: int):
+        self.bits = bits
+        self.hashes = hashes
+        self._array = bytearray((bits + 7) // 8)
+
+    def _positions(self, digest: str):
+        raw = bytes.fromhex(digest)
+        for i in range(self.hashes):
+            yield int.from_bytes(raw[i * 4 : (i + 1) * 4], "big") % self.bits
+
+    def add(self, digest: str):
+        for position in self._positions(digest):
+            self._array[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, digest: str) -> bool:
+        return all(
+            self._array[position >> 3] & (1 << (position & 7))
+            for position in self._positions(digest)
+        )
+
+
+class RevocationFilter:
+    """
+    Local negative cache of blacklisted tokens. A background thread loads the
+    blacklist from Redis and follows new revocations published on CHANNEL.
+    Until it is in sync, every token is reported as possibly revoked.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bloom = None
+        self._pid = None
+        self._reconnected = threading.Event()
+
+    def might_contain(self, digest: str) -> bool:
+        if not settings.JWT_BLACKLIST_FILTER:
+            return True
+
+        self._start()
+        bloom = self._bloom
+        return bloom is None or digest in bloom
+
+    def publish(self, digest: str):
+        if not settings.JWT_BLACKLIST_FILTER:
+            return
+
+        if (bloom := self._bloom) is not None:
+            bloom.add(digest)
+        get_client().publish(CHANNEL, digest)
+
+    def _start(self):
+        # Threads do not survive a fork, every worker process runs its own.
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._bloom = None
+            threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self):
+        while True:
+            try:
+                self._sync()
+            except redis.RedisError as error:
+                logger.warning(f"Token blacklist filter out of sync: {error!r}")
+                self._bloom = None
+                time.sleep(RETRY_DELAY)
+
+    def _on_reconnect(self, connection):
+        # Revocations published while the connection was down are lost, the
+        # filter cannot be trusted until it is loaded again.
+        self._bloom = None
+        self._reconnected.set()
+
+    def _sync(self):
+        client = get_client()
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        # Subscribing before the scan keeps revocations made meanwhile.
+        pubsub.subscribe(CHANNEL)
+        # The pubsub reconnects on its own instead of raising, so a reconnect
+        # ends this sync and the next one scans the blacklist again.
+        self._reconnected.clear()
+        connection = pubsub.connection
+        connection.register_connect_callback(self._on_reconnect)
+
+        try:
+            bloom = BloomFilter(
+                bits=settings.JWT_BLACKLIST_FILTER_BITS,
+                hashes=settings.JWT_BLACKLIST_FILTER_HASHES,
+            )
+            prefix = len(cache.make_key(blacklist_key("")))
+            for key in client.scan_iter(
+                match=cache.make_key(blacklist_key("*")), count=1000
+            ):
+                bloom.add(key.decode()[prefix:])
+            while message := pubsub.get_message(timeout=0):
+                bloom.add(message["data"].decode())
+            if not self._reconnected.is_set():
+                self._bloom = bloom
+
+            # Expired tokens are never removed from the filter, rebuilding it
+            # from the live keys keeps the false positive rate down.
+            rebuild_at = time.monotonic() + settings.JWT_BLACKLIST_FILTER_REBUILD
+            while time.monotonic() < rebuild_at and not self._reconnected.is_set():
+                if message := pubsub.get_message(timeout=1):
+                    bloom.add(message["data"].decode())
+        finally:
+            self._bloom = None
+            connection.deregister_connect_callback(self._on_reconnect)
+            pubsub.close()
+
+
+revocations = RevocationFilter()
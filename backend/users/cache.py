@@ -0,0 +1,84 @@
+from copy import copy
+from time import time, time_ns
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+from app.versions import get_versions, version_key
+from .auth_token import token_digest
+from .blacklist import blacklist_key, revocations
+from .lru import LRUCache
+from .models import User
+from .queries import get_user_by_id
+
+# Entries live only a few seconds, so other processes see changes without a
+# broadcast, while saves in this process drop them right away.
+_users = LRUCache(maxsize=settings.USER_CACHE_LOCAL_SIZE)
+
+
+def user_cache_key(uid: int) -> str:
+    return f"user:{uid}"
+
+
+def _remember(uid: int, user: User):
+    _users.set(uid, user, expires_at=time() + settings.USER_CACHE_LOCAL_TTL)
+
+
+def _user_version(uid: int, values: dict) -> int:
+    key = version_key("user", uid)
+    return get_versions(key, cached=values)[key]
+
+
+def get_cached_user(uid: int) -> User:
+    user = _users.get(uid)
+    if user is None:
+        values = cache.get_many([user_cache_key(uid), version_key("user", uid)])
+        # Entries are stored with the version read before the query, so one
+        # written after an invalidation it raced with no longer matches.
+        version = _user_version(uid, values)
+        entry = values.get(user_cache_key(uid))
+        if entry is not None and entry[0] == version:
+            user = entry[1]
+        else:
+            user = get_user_by_id(uid=uid)
+            cache.set(
+                user_cache_key(uid), (version, user), timeout=settings.USER_CACHE_TTL
+            )
+        _remember(uid, user)
+
+    # Callers cache per request state on the user, e.g. its permission
+    # checker, which must not leak into the shared instance.
+    return copy(user)
+
+
+def read_auth_bundle(token: str, uid: int) -> tuple[bool, Optional[User]]:
+    """
+    Returns whether the token is blacklisted and the cached user, if any,
+    reading whatever the local caches miss in a single MGET.
+    """
+    digest = token_digest(token)
+    keys = []
+    if revocations.might_contain(digest):
+        keys.append(blacklist_key(digest))
+    if (user := _users.get(uid)) is None:
+        keys += [user_cache_key(uid), version_key("user", uid)]
+
+    values = cache.get_many(keys) if keys else {}
+    if (
+        user is None
+        and (entry := values.get(user_cache_key(uid))) is not None
+        and entry[0] == _user_version(uid, values)
+    ):
+        user = entry[1]
+        _remember(uid, user)
+
+    return blacklist_key(digest) in values, copy(user) if user else None
+
+
+def invalidate_user(uid: int):
+    _users.delete(uid)
+    # A new version rather than a delete, a lookup that read the user before
+    # this could otherwise store it again for USER_CACHE_TTL.
+    cache.set(version_key("user", uid), time_ns(), timeout=settings.VERSION_TTL)
+    cache.delete(user_cache_key(uid))
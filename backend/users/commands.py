@@ -1,3 +1,5 @@
+from typing import Optional
+
 from django.contrib.auth.tokens import default_token_generator
 from ninja.errors import HttpError
 
@@ -13,6 +15,13 @@ def activate_user_account(user: User, token: str):
         raise InvalidActivationToken
 
 
+def update_profile(user: User, notification_digest: Optional[bool]) -> User:
+    user.notification_digest = notification_digest
+    user.save(update_fields=["notification_digest"])
+
+    return user
+
+
 def create_user(email: str, password: str) -> User:
     if User.objects.filter(email=email).exists():
         raise HttpError(400, "Email already in use.")
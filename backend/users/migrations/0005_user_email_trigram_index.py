@@ -0,0 +1,32 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+# Matches the UPPER(col::text) LIKE UPPER(%s) predicate of icontains lookups.
+CREATE_EMAIL_TRIGRAM_INDEX = """
+CREATE INDEX users_user_email_trgm_idx
+ON users_user USING gin ((UPPER(email::text)) gin_trgm_ops);
+"""
+
+DROP_EMAIL_TRIGRAM_INDEX = "DROP INDEX IF EXISTS users_user_email_trgm_idx;"
+
+
+def run_on_postgresql(sql):
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor == "postgresql":
+            schema_editor.execute(sql)
+
+    return operation
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0004_alter_user_is_active"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(
+            run_on_postgresql(CREATE_EMAIL_TRIGRAM_INDEX),
+            run_on_postgresql(DROP_EMAIL_TRIGRAM_INDEX),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-18 08:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0005_user_email_trigram_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="notification_digest",
+            field=models.BooleanField(blank=True, default=None, null=True),
+        ),
+    ]
@@ -45,6 +45,9 @@ class User(AbstractBaseUser, PermissionsMixin):
     is_active = models.BooleanField(default=False)
     is_staff = models.BooleanField(default=False)
     is_superuser = models.BooleanField(default=False)
+    # One email per sweep listing all due tasks instead of one per task,
+    # None follows the NOTIFICATION_DIGEST setting.
+    notification_digest = models.BooleanField(null=True, blank=True, default=None)
 
     USERNAME_FIELD = "email"
 
@@ -1,15 +1,28 @@
 import json
 from unittest.mock import patch, MagicMock
 
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase, RequestFactory
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth.tokens import default_token_generator
 from ninja.errors import HttpError
+import jwt
 
+from app.versions import version_key
 from .models import User
 from .api import register, UserInput
 from .exceptions import InvalidActivationToken
-from .auth_token import AuthToken
+from .auth_token import AuthToken, _verified_tokens, token_digest
+from .blacklist import BloomFilter, blacklist_key, revocations
+from .cache import (
+    get_cached_user,
+    invalidate_user,
+    read_auth_bundle,
+    user_cache_key,
+    _users,
+)
 from . import commands
 from . import queries
 
@@ -21,7 +34,7 @@ def create_user(email: str, password: str, is_active: bool = False):
 @patch("users.api.create_user")
 @patch("users.api.default_token_generator.make_token")
 @patch("users.api.reverse")
-@patch("users.api.send_mail")
+@patch("users.api.enqueue_email")
 class RegisterViewTests(TestCase):
     def setUp(self):
         self.request_factory = RequestFactory()
@@ -29,13 +42,13 @@ class RegisterViewTests(TestCase):
 
     def test_register_sends_activation_email_on_success(
         self,
-        mock_send_mail: MagicMock,
+        mock_enqueue_email: MagicMock,
         mock_reverse: MagicMock,
         mock_make_token: MagicMock,
         mock_create_user: MagicMock,
     ):
         """
-        Calls create_user, make_token, reverse, build_absolute_uri and send_mail with correct parameters in positive case scenario.
+        Calls create_user, make_token, reverse, build_absolute_uri and enqueue_email with correct parameters in positive case scenario.
         """
         EMAIL = "test@test.com"
         PASSWORD = "pass"
@@ -70,16 +83,18 @@ class RegisterViewTests(TestCase):
         )
         request.build_absolute_uri.assert_called_once_with(REVERSE_RETURN_VALUE)
 
-        mock_send_mail.assert_called_once_with(
+        mock_enqueue_email.assert_called_once_with(
+            recipient=CREATE_USER_RETURN_VALUE.email,
+            kind="activation",
+            object_id=CREATE_USER_RETURN_VALUE.pk,
             subject="Activate your account",
             message=f"Click the link to activate your account: {BUILD_ABSOLUTE_URI_RETURN_VALUE}",
             from_email="noreply@test.com",
-            recipient_list=[CREATE_USER_RETURN_VALUE.email],
         )
 
     def test_user_creation_failure(
         self,
-        mock_send_mail: MagicMock,
+        mock_enqueue_email: MagicMock,
         mock_reverse: MagicMock,
         mock_make_token: MagicMock,
         mock_create_user: MagicMock,
@@ -106,7 +121,7 @@ class RegisterViewTests(TestCase):
         mock_create_user.assert_called_once_with(email="", password="")
         mock_reverse.assert_not_called()
         mock_make_token.assert_not_called()
-        mock_send_mail.assert_not_called()
+        mock_enqueue_email.assert_not_called()
 
 
 @patch("users.api.get_user_by_id")
@@ -299,7 +314,7 @@ class LoginViewTests(TestCase):
         self.assertEqual(content["detail"], "Account is not active.")
 
 
-@patch("app.api.AuthToken.is_token_blacklisted")
+@patch("app.api.read_auth_bundle")
 @patch("users.api.AuthToken.blacklist_token")
 class LogoutViewTests(TestCase):
     def setUp(self):
@@ -309,12 +324,12 @@ class LogoutViewTests(TestCase):
         self.client.cookies["refresh_token"] = self.TOKENS["refresh_token"]
 
     def test_succesful_logout(
-        self, mock_blacklist_token: MagicMock, mock_is_token_blacklisted: MagicMock
+        self, mock_blacklist_token: MagicMock, mock_read_auth_bundle: MagicMock
     ):
         """
         Blacklists access and refresh token.
         """
-        mock_is_token_blacklisted.return_value = False
+        mock_read_auth_bundle.return_value = (False, None)
 
         response = self.client.post(
             path=reverse("api-1:logout"),
@@ -337,6 +352,40 @@ class LogoutViewTests(TestCase):
         self.assertEqual(content["detail"], "You have successfully logged out.")
 
 
+class ProfileViewTests(TestCase):
+    def setUp(self):
+        self.user = create_user(email="test@test.com", password="pass", is_active=True)
+        self.HEADERS = {
+            "HTTP_AUTHORIZATION": f"Bearer {AuthToken.create_tokens(self.user.id)['access_token']}"
+        }
+
+    def test_update_notification_digest(self):
+        """
+        Sets the digest preference and resets it to the global default with null.
+        """
+        response = self.client.patch(
+            path=reverse("api-1:update_profile"),
+            data={"notification_digest": True},
+            content_type="application/json",
+            **self.HEADERS,
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            json.loads(response.text),
+            {"email": "test@test.com", "notification_digest": True},
+        )
+
+        self.client.patch(
+            path=reverse("api-1:update_profile"),
+            data={"notification_digest": None},
+            content_type="application/json",
+            **self.HEADERS,
+        )
+        self.user.refresh_from_db()
+        self.assertIsNone(self.user.notification_digest)
+
+
 class CreateUserCommandTests(TestCase):
     def test_user_is_created(self):
         email = "test@email.com"
@@ -377,3 +426,260 @@ class GetUserByIdQueryTests(TestCase):
         retrieved_user = queries.get_user_by_id(user.id)
 
         self.assertEqual(user, retrieved_user)
+
+
+class UserCacheTests(TestCase):
+    def setUp(self):
+        self.user = create_user(email="test@test.com", password="pass", is_active=True)
+
+    def test_cached_user_is_loaded_once(self):
+        """
+        Later lookups are served from the local tier and then from the shared cache.
+        """
+        with self.assertNumQueries(1):
+            get_cached_user(uid=self.user.id)
+        with self.assertNumQueries(0):
+            get_cached_user(uid=self.user.id)
+
+        _users.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_cached_user(uid=self.user.id).email, "test@test.com")
+
+    def test_save_invalidates_cached_user(self):
+        """
+        Saving or deactivating a user drops it from both tiers.
+        """
+        get_cached_user(uid=self.user.id)
+
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertFalse(get_cached_user(uid=self.user.id).is_active)
+
+    def test_invalidation_during_lookup_is_not_overwritten(self):
+        """
+        A user read before a concurrent save is not served once the save invalidated it.
+        """
+
+        def read_then_save(uid):
+            user = queries.get_user_by_id(uid=uid)
+            User.objects.filter(id=uid).update(is_active=False)
+            invalidate_user(uid=uid)
+            return user
+
+        with patch("users.cache.get_user_by_id", side_effect=read_then_save):
+            self.assertTrue(get_cached_user(uid=self.user.id).is_active)
+
+        _users.clear()
+        self.assertFalse(get_cached_user(uid=self.user.id).is_active)
+
+    def test_cached_user_is_copied_per_lookup(self):
+        """
+        State attached to one returned user does not leak into later lookups.
+        """
+        get_cached_user(uid=self.user.id).request_state = "first"
+
+        self.assertFalse(hasattr(get_cached_user(uid=self.user.id), "request_state"))
+
+    @patch("users.cache.cache")
+    def test_auth_bundle_reads_blacklist_and_user_at_once(self, mock_cache: MagicMock):
+        """
+        Blacklist state and the cached user are fetched with a single cache call.
+        """
+        _users.clear()
+        token = AuthToken.encode_jwt(uid=self.user.id, exp=60)
+        keys = [
+            blacklist_key(token_digest(token)),
+            user_cache_key(self.user.id),
+            version_key("user", self.user.id),
+        ]
+        mock_cache.get_many.return_value = {
+            keys[0]: True,
+            keys[1]: (1, self.user),
+            keys[2]: 1,
+        }
+
+        blacklisted, user = read_auth_bundle(token=token, uid=self.user.id)
+
+        self.assertTrue(blacklisted)
+        self.assertEqual(user.email, "test@test.com")
+        mock_cache.get_many.assert_called_once_with(keys)
+
+        read_auth_bundle(token=token, uid=self.user.id)
+        mock_cache.get_many.assert_called_with(keys[:1])
+        mock_cache.get.assert_not_called()
+
+    @patch("users.api.AuthToken.blacklist_token")
+    def test_endpoint_without_user_does_not_load_it(
+        self, mock_blacklist_token: MagicMock
+    ):
+        """
+        The authenticated user is loaded lazily, logout never reads it.
+        """
+        tokens = AuthToken.create_tokens(self.user.id)
+        self.client.cookies["refresh_token"] = tokens["refresh_token"]
+        _users.clear()
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(
+                path=reverse("api-1:logout"),
+                HTTP_AUTHORIZATION=f"Bearer {tokens['access_token']}",
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(context.captured_queries), 0)
+
+
+class DecodeJWTCacheTests(TestCase):
+    def setUp(self):
+        _verified_tokens.clear()
+        self.token = AuthToken.encode_jwt(uid=1, exp=60)
+
+    @patch("users.auth_token.jwt.decode", wraps=jwt.decode)
+    def test_repeated_decode_skips_verification(self, mock_decode: MagicMock):
+        """
+        A verified token is decoded once and later served from the cache.
+        """
+        self.assertEqual(AuthToken.decode_jwt(self.token)["uid"], 1)
+        self.assertEqual(AuthToken.decode_jwt(self.token)["uid"], 1)
+
+        mock_decode.assert_called_once()
+        self.assertEqual(
+            AuthToken.decode_cache_stats(), {"hits": 1, "misses": 1, "size": 1}
+        )
+
+    @patch("users.auth_token.jwt.decode", wraps=jwt.decode)
+    def test_cached_token_expires_with_its_exp(self, mock_decode: MagicMock):
+        """
+        The cached claims are not served past the token's exp.
+        """
+        payload = AuthToken.decode_jwt(self.token)
+
+        with patch("users.lru.time", return_value=payload["exp"] + 1):
+            AuthToken.decode_jwt(self.token)
+
+        self.assertEqual(mock_decode.call_count, 2)
+
+    @patch("users.auth_token.cache")
+    @patch("users.auth_token.jwt.decode", wraps=jwt.decode)
+    def test_blacklisting_drops_cached_token(
+        self, mock_decode: MagicMock, mock_cache: MagicMock
+    ):
+        """
+        A blacklisted token is verified again on its next use.
+        """
+        AuthToken.decode_jwt(self.token)
+        AuthToken.blacklist_token(token=self.token, timeout=60)
+        AuthToken.decode_jwt(self.token)
+
+        self.assertEqual(mock_decode.call_count, 2)
+
+
+class BlacklistTests(TestCase):
+    @patch("users.auth_token.cache")
+    def test_blacklist_key_is_digest_with_remaining_ttl(self, mock_cache: MagicMock):
+        """
+        Stores the token digest for as long as the token is still valid.
+        """
+        token = AuthToken.encode_jwt(uid=1, exp=60)
+
+        AuthToken.blacklist_token(token=token)
+
+        key, _value = mock_cache.set.call_args.args
+        self.assertEqual(key, blacklist_key(token_digest(token)))
+        self.assertLessEqual(len(key), 80)
+        self.assertTrue(55 <= mock_cache.set.call_args.kwargs["timeout"] <= 60)
+
+    @patch("users.auth_token.cache")
+    def test_expired_token_is_not_stored(self, mock_cache: MagicMock):
+        """
+        A token past its exp cannot be used anymore and needs no blacklist entry.
+        """
+        AuthToken.blacklist_token(token=AuthToken.encode_jwt(uid=1, exp=-10))
+
+        mock_cache.set.assert_not_called()
+
+    def test_blacklisted_token_is_rejected(self):
+        """
+        A blacklisted token is reported as such, other tokens are not.
+        """
+        token = AuthToken.encode_jwt(uid=1, exp=60)
+        other = AuthToken.encode_jwt(uid=2, exp=60)
+
+        AuthToken.blacklist_token(token=token)
+
+        self.assertTrue(AuthToken.is_token_blacklisted(token))
+        self.assertFalse(AuthToken.is_token_blacklisted(other))
+
+
+@patch("users.blacklist.get_client")
+@patch.object(revocations, "_start")
+class RevocationFilterTests(TestCase):
+    def setUp(self):
+        revocations._bloom = BloomFilter(bits=1024, hashes=4)
+
+    def tearDown(self):
+        revocations._bloom = None
+
+    def test_bloom_filter_membership(self, mock_start, mock_get_client):
+        """
+        Added digests are always found, others are rejected.
+        """
+        bloom = BloomFilter(bits=1024, hashes=4)
+        added, other = token_digest("added"), token_digest("other")
+
+        bloom.add(added)
+
+        self.assertIn(added, bloom)
+        self.assertNotIn(other, bloom)
+
+    @patch("users.auth_token.cache")
+    def test_unrevoked_token_skips_cache_lookup(
+        self, mock_cache: MagicMock, mock_start, mock_get_client
+    ):
+        """
+        Tokens missing from the synced filter are accepted without a cache round trip.
+        """
+        token = AuthToken.encode_jwt(uid=1, exp=60)
+
+        with self.settings(JWT_BLACKLIST_FILTER=True):
+            self.assertFalse(AuthToken.is_token_blacklisted(token))
+            mock_cache.get.assert_not_called()
+
+            AuthToken.blacklist_token(token=token)
+            AuthToken.is_token_blacklisted(token)
+
+        mock_cache.get.assert_called_once()
+        mock_get_client.return_value.publish.assert_called_once_with(
+            "auth:blacklist", token_digest(token)
+        )
+
+    def test_reconnect_drops_filter_until_resynced(self, mock_start, mock_get_client):
+        """
+        A revocation published while the pubsub was reconnecting is not missed.
+        """
+        token = AuthToken.encode_jwt(uid=1, exp=60)
+        pubsub = mock_get_client.return_value.pubsub.return_value
+        mock_get_client.return_value.scan_iter.return_value = []
+        rejected = []
+
+        def get_message(timeout):
+            if timeout == 0:
+                return None
+            # Revoked elsewhere while the connection is down, the publish is lost.
+            cache.set(blacklist_key(token_digest(token)), True, timeout=60)
+            rejected.append(AuthToken.is_token_blacklisted(token))
+            on_connect = pubsub.connection.register_connect_callback.call_args.args[0]
+            on_connect(pubsub.connection)
+            rejected.append(AuthToken.is_token_blacklisted(token))
+            return None
+
+        pubsub.get_message.side_effect = get_message
+
+        with self.settings(JWT_BLACKLIST_FILTER=True):
+            revocations._sync()
+            self.assertTrue(AuthToken.is_token_blacklisted(token))
+
+        # Rejected once the connection is back, long before the hourly rebuild.
+        self.assertEqual(rejected, [False, True])
+        pubsub.close.assert_called_once()